@@ -0,0 +1,153 @@
+# analytics.py - Statistiques de ventes et de marges calculées par la base de données
+import time
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import func, or_
+
+import metrics
+from models import db, Trip
+
+TIME_BUCKETS = {
+    # bucket: (format PostgreSQL, format SQLite)
+    'day': ('YYYY-MM-DD', '%Y-%m-%d'),
+    # Semaine : lundi qui l'ouvre ('2026-10-19'), même début de semaine ISO sur les deux moteurs
+    'week': ('YYYY-MM-DD', '%Y-%m-%d'),
+    'month': ('YYYY-MM', '%Y-%m'),
+    'year': ('YYYY', '%Y'),
+}
+DATE_FIELDS = ('created_at', 'assigned_at', 'sold_at')
+GROUP_BY_FIELDS = ('status', 'destination')
+
+# Au plus autant de combinaisons de filtres gardées en mémoire (les plus anciennes partent d'abord)
+MAX_CACHE_ENTRIES = 256
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _parse_date(value, name):
+    """'2026-10-01' -> datetime(2026, 10, 1) ; ValueError lisible sinon (400 plutôt qu'une erreur SQL)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    try:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time())
+    except (TypeError, ValueError):
+        raise ValueError(f"Date invalide pour {name} : {value} (format AAAA-MM-JJ)")
+
+
+def _filter_trips(query, date_column, status=None, date_from=None, date_to=None):
+    if status:
+        query = query.filter(Trip.status == status)
+    if date_from:
+        query = query.filter(date_column >= date_from)
+    if date_to:
+        query = query.filter(date_column < date_to)
+    return query
+
+
+def _bucket_expression(column, bucket):
+    pg_format, sqlite_format = TIME_BUCKETS[bucket]
+    if db.engine.dialect.name == 'postgresql':
+        if bucket == 'week':
+            column = func.date_trunc('week', column)
+        return func.to_char(column, pg_format)
+    if bucket == 'week':
+        # Dimanche suivant (ou le jour même) moins 6 jours : le lundi de la semaine
+        return func.strftime(sqlite_format, column, 'weekday 0', '-6 days')
+    return func.strftime(sqlite_format, column)
+
+
+def sales_breakdown(bucket='month', group_by=None, date_field='created_at', status=None, date_from=None, date_to=None):
+    """Volume, chiffre d'affaires et marge agrégés par période (et éventuellement par statut ou destination)."""
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Période inconnue : {bucket}")
+    if date_field not in DATE_FIELDS:
+        raise ValueError(f"Champ de date inconnu : {date_field}")
+    if group_by and group_by not in GROUP_BY_FIELDS:
+        raise ValueError(f"Regroupement inconnu : {group_by}")
+    date_from = _parse_date(date_from, 'from')
+    date_to = _parse_date(date_to, 'to')
+
+    date_column = getattr(Trip, date_field)
+    period = _bucket_expression(date_column, bucket).label('period')
+    columns = [period]
+    if group_by:
+        columns.append(getattr(Trip, group_by).label(group_by))
+
+    query = db.session.query(
+        *columns,
+        func.count(Trip.id).label('trips'),
+        func.coalesce(func.sum(Trip.price), 0).label('revenue'),
+        func.coalesce(func.sum(Trip.margin), 0).label('margin'),
+    ).filter(date_column.isnot(None))
+    query = _filter_trips(query, date_column, status, date_from, date_to)
+
+    group_columns = [period] + ([getattr(Trip, group_by)] if group_by else [])
+    rows = query.group_by(*group_columns).order_by(*group_columns).all()
+
+    results = []
+    for row in rows:
+        item = {
+            'period': row.period,
+            'trips': row.trips,
+            'revenue': int(row.revenue),
+            'margin': int(row.margin),
+            'average_margin': round(int(row.margin) / row.trips) if row.trips else 0,
+        }
+        if group_by:
+            item[group_by] = getattr(row, group_by)
+        results.append(item)
+    return results
+
+
+def conversion_funnel(date_field='created_at', status=None, date_from=None, date_to=None):
+    """Nombre de voyages proposés, assignés à un client et vendus, avec les taux de conversion.
+
+    Les étapes sont cumulatives et portent sur les mêmes voyages (ceux retenus par les filtres,
+    comme pour sales_breakdown) : tout voyage a été proposé, un voyage vendu compte aussi comme
+    assigné (même vendu sans passer par l'assignation).
+    """
+    if date_field not in DATE_FIELDS:
+        raise ValueError(f"Champ de date inconnu : {date_field}")
+    date_column = getattr(Trip, date_field)
+    query = db.session.query(
+        func.count(Trip.id).label('proposed'),
+        func.count(Trip.id).filter(or_(Trip.assigned_at.isnot(None), Trip.sold_at.isnot(None))).label('assigned'),
+        func.count(Trip.sold_at).label('sold'),
+        func.coalesce(func.sum(Trip.margin).filter(Trip.status == 'sold'), 0).label('sold_margin'),
+    )
+    row = _filter_trips(query, date_column, status, _parse_date(date_from, 'from'), _parse_date(date_to, 'to')).one()
+
+    return {
+        'proposed': row.proposed,
+        'assigned': row.assigned,
+        'sold': row.sold,
+        'sold_margin': int(row.sold_margin),
+        'proposed_to_assigned': round(row.assigned / row.proposed, 3) if row.proposed else None,
+        'assigned_to_sold': round(row.sold / row.assigned, 3) if row.assigned else None,
+    }
+
+
+def cached(key, ttl, compute):
+    """Retourne le résultat mis en cache pour `key` s'il a moins de `ttl` secondes, sinon le recalcule."""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and now - entry[0] < ttl:
+            metrics.record_cache('analytics', True)
+            return entry[1], True
+    metrics.record_cache('analytics', False)
+
+    value = compute()
+    with _cache_lock:
+        _cache[key] = (now, value)
+        if len(_cache) > MAX_CACHE_ENTRIES:
+            # Les entrées expirées d'abord, puis les plus anciennes
+            for stale_key in [k for k, (stored_at, _) in _cache.items() if now - stored_at >= ttl]:
+                del _cache[stale_key]
+            for stale_key in sorted(_cache, key=lambda k: _cache[k][0])[:len(_cache) - MAX_CACHE_ENTRIES]:
+                del _cache[stale_key]
+    return value, False
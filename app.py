@@ -1,30 +1,55 @@
 # app.py - Version finale et complète
 import os
-import json
+import copy
+import hmac
 import requests
 from datetime import datetime, date
-import traceback
+from urllib.parse import urljoin
+import logging
 from werkzeug.utils import secure_filename
 
 from dotenv import load_dotenv
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
-if os.path.exists(dotenv_path):
+dotenv_found = os.path.exists(dotenv_path)
+if dotenv_found:
     load_dotenv(dotenv_path=dotenv_path)
-    print("✅ Fichier .env chargé explicitement.")
+
+# Configuré après le .env pour tenir compte de LOG_LEVEL / LOG_FORMAT
+from logging_config import configure_logging, init_request_logging
+configure_logging()
+logger = logging.getLogger(__name__)
+if dotenv_found:
+    logger.info("✅ Fichier .env chargé explicitement.")
 else:
-    print("⚠️ Fichier .env introuvable au chemin:", dotenv_path)
+    logger.warning("⚠️ Fichier .env introuvable au chemin: %s", dotenv_path)
 
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context, send_from_directory
 from flask_migrate import Migrate
 from flask_mail import Mail, Message
 from flask_cors import CORS
 from weasyprint import HTML
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
 from config import Config
-from models import db, Trip, Invoice
-from services import RealAPIGatherer, generate_travel_page_html, PublicationService
+from database import PoolMonitor
+import metrics
+from profiling import ProfileStore, init_profiling
+import fastjson
+from models import db, Trip, TripOffer, Invoice
+from services import OFFER_CSS_PATH, RealAPIGatherer, generate_travel_page_html, PublicationService
+from images import preferred_image_url
+from pricing import compute_pricing, reprice_trips
+from analytics import sales_breakdown, conversion_funnel, cached
+from stripe_catalog import create_checkout_session
+from stripe_events import StripeEventWorker, record_event
+from feed import build_published_feed, init_feed_publisher
+from manifest import PublicationManifest
+from reconcile import reconcile
+from autocomplete import init_hotel_autocomplete
+from search import search_trips
+import click
 import stripe
 
 mail = Mail()
@@ -33,21 +58,42 @@ migrate = Migrate()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = fastjson.FastJSONProvider(app)
 
     CORS(app, resources={r"/api/*": {"origins": ["https://voyages-privileges.be", "https://www.voyages-privileges.be"]}})
 
-    print(f"🔑 Clé API Google chargée : {'Oui' if app.config.get('GOOGLE_API_KEY') else 'Non'}")
-    print(f"🔑 Clé API Stripe chargée : {'Oui' if app.config.get('STRIPE_API_KEY') else 'Non'}")
+    logger.info("🔑 Clé API Google chargée : %s", 'Oui' if app.config.get('GOOGLE_API_KEY') else 'Non')
+    logger.info("🔑 Clé API Stripe chargée : %s", 'Oui' if app.config.get('STRIPE_API_KEY') else 'Non')
+    if not os.path.exists(OFFER_CSS_PATH):
+        logger.error("❌ Feuille des offres absente (%s) : lancer build_offer_css.py avant de publier", OFFER_CSS_PATH)
 
 
     db.init_app(app)
     mail.init_app(app)
     migrate.init_app(app, db)
+
+    with app.app_context():
+        pool_monitor = PoolMonitor(db.engine)
+        metrics.instrument_engine(db.engine)
+    init_request_logging(app)
+    metrics.instrument_app(app)
+    profile_store = ProfileStore(
+        app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles'),
+        max_files=app.config.get('PROFILE_MAX_FILES') or 200
+    )
+    init_profiling(app, profile_store)
+    metrics.register_gauges('db_pool', pool_monitor.gauges)
     
     if app.config['STRIPE_API_KEY']:
         stripe.api_key = app.config['STRIPE_API_KEY']
+    if app.config.get('STRIPE_API_BASE'):
+        stripe.api_base = app.config['STRIPE_API_BASE']
+    # Les nouvelles tentatives réutilisent la même clé d'idempotence (aucun doublon côté Stripe)
+    stripe.max_network_retries = app.config.get('STRIPE_MAX_NETWORK_RETRIES', 2)
 
-    publication_service = PublicationService(app.config)
+    publication_service = PublicationService(app.config, manifest=PublicationManifest())
+    feed_publisher = init_feed_publisher(app, publication_service)
+    hotel_autocomplete = init_hotel_autocomplete(app)
 
     USERS = {
         os.environ.get('USER1_NAME', 'Sam'): os.environ.get('USER1_PASS', 'samuel1205'),
@@ -59,7 +105,7 @@ def create_app(config_class=Config):
 
     @app.before_request
     def require_login():
-        if not check_auth() and request.endpoint not in ['login', 'static', 'stripe_webhook', 'published_trips']:
+        if not check_auth() and request.endpoint not in ['login', 'static', 'stripe_webhook', 'published_trips', 'offer_image', 'metrics_export']:
             return redirect(url_for('login'))
 
     @app.route('/login', methods=['GET', 'POST'])
@@ -86,38 +132,43 @@ def create_app(config_class=Config):
 
     @app.route('/api/published-trips')
     def published_trips():
-        trips = Trip.query.filter_by(is_published=True).order_by(Trip.created_at.desc()).all()
-        trips_data = []
-        for trip in trips:
-            trip_dict = trip.to_dict()
-            full_data = json.loads(trip.full_data_json)
-            image_url = full_data.get('api_data', {}).get('photos', [None])[0]
-            savings = full_data.get('savings', 0)
-            hotel_name_only = trip.hotel_name.split(',')[0].strip()
-            
-            num_people = full_data.get('form_data', {}).get('num_people', 2)
-            
-            duration_days = 0
-            if trip_dict.get('date_start') and trip_dict.get('date_end'):
-                try:
-                    date_start = datetime.strptime(trip_dict['date_start'], '%Y-%m-%d')
-                    date_end = datetime.strptime(trip_dict['date_end'], '%Y-%m-%d')
-                    duration_days = (date_end - date_start).days
-                except (ValueError, TypeError):
-                    duration_days = 0
-
-            trips_data.append({
-                'hotel_name': hotel_name_only,
-                'destination': trip.destination,
-                'price': trip.price,
-                'image_url': image_url,
-                'offer_url': f"{app.config['SITE_PUBLIC_URL']}/offres/{trip.published_filename}",
-                'savings': savings,
-                'num_people': num_people,
-                'is_ultra_budget': trip.is_ultra_budget,
-                'duration': duration_days
-            })
-        return jsonify(trips_data)
+        # La galerie lit désormais offres/index.json sur le site ; cette route reste pour les anciens clients
+        return jsonify(build_published_feed(app.config['SITE_PUBLIC_URL']))
+
+    @app.cli.command('publish-feed')
+    def publish_feed_command():
+        """Régénère et envoie offres/index.json immédiatement."""
+        feed_publisher.publish()
+
+    @app.cli.command('reconcile-publications')
+    @click.option('--dry-run', is_flag=True, help="Affiche les corrections sans les appliquer.")
+    def reconcile_publications_command(dry_run):
+        """Compare offres/ et clients/ sur le site avec la base et corrige les écarts."""
+        plan, failures = reconcile(publication_service, feed_publisher, dry_run=dry_run)
+        if plan is None:
+            raise click.ClickException("Impossible de lister les fichiers du site (voir les journaux).")
+        for directory, filename in plan.deletes:
+            click.echo(f"🗑️  {directory}/{filename} (orphelin)")
+        for directory, filename in plan.unknown:
+            click.echo(f"❓ {directory}/{filename} (inconnu, conservé)")
+        for label, republish in (('offre', plan.republish_public), ('page client', plan.republish_client)):
+            for trip_id, filenames in republish.items():
+                click.echo(f"📤 {label} du voyage {trip_id} : {', '.join(filenames)}")
+        if plan.publish_feed:
+            click.echo("📰 offres/index.json")
+        if plan.is_empty:
+            click.echo("✅ Le site est conforme à la base.")
+        elif dry_run:
+            click.echo("(simulation : rien n'a été modifié)")
+        elif failures:
+            raise click.ClickException(f"{failures} opération(s) en échec.")
+
+    if publication_service.image_pipeline.storage == 'local':
+        # En mode 'upload', les images sont servies par le site : pas de route publique ici
+        @app.route('/images/<path:filename>')
+        def offer_image(filename):
+            """Sert les déclinaisons d'images quand IMAGE_STORAGE='local' (développement)."""
+            return send_from_directory(publication_service.image_pipeline.cache_dir, filename, max_age=31536000)
 
     @app.route('/generation')
     def generation_tool():
@@ -125,6 +176,27 @@ def create_app(config_class=Config):
                                username=session.get('username'), 
                                google_api_key=app.config['GOOGLE_API_KEY'])
 
+    @app.route('/api/hotel-autocomplete')
+    def autocomplete_hotels():
+        """Suggestions d'hôtels (hôtels déjà vendus, cache, puis Places avec le jeton de session)."""
+        suggestions, source = hotel_autocomplete.suggest(request.args.get('q', ''), request.args.get('session'))
+        return jsonify({
+            'success': True,
+            'source': source,
+            'suggestions': [{key: item[key] for key in ('description', 'place_id', 'destination', 'source')}
+                            for item in suggestions],
+        })
+
+    @app.route('/api/hotel-autocomplete/details')
+    def autocomplete_hotel_details():
+        place_id = request.args.get('place_id')
+        if not place_id:
+            return jsonify({'success': False, 'error': 'place_id manquant'}), 400
+        details = hotel_autocomplete.details(place_id, request.args.get('session'))
+        if details is None:
+            return jsonify({'success': False, 'error': 'Détails indisponibles'}), 502
+        return jsonify({'success': True, 'details': details})
+
     @app.route('/dashboard')
     def dashboard():
         view_mode = request.args.get('view', 'proposed')
@@ -156,40 +228,65 @@ def create_app(config_class=Config):
                 return jsonify({'success': False, 'error': 'Tous les champs requis ne sont pas remplis.'}), 400
 
             real_data = gatherer.gather_all_real_data(data['hotel_name'], data['destination'])
-            
-            try:
-                hotel_b2b_price = int(data.get('hotel_b2b_price') or 0)
-                hotel_b2c_price = int(data.get('hotel_b2c_price') or 0)
-                pack_price = int(data.get('pack_price') or 0)
-                flight_price = int(data.get('flight_price') or 0)
-                transfer_cost = int(data.get('transfer_cost') or 0)
-                surcharge_cost = int(data.get('surcharge_cost') or 0)
-                car_rental_cost = int(data.get('car_rental_cost') or 0)
-
-                total_cost_b2b = hotel_b2b_price + flight_price + transfer_cost + surcharge_cost + car_rental_cost
-                margin = pack_price - total_cost_b2b
-
-                comparison_total = hotel_b2c_price + flight_price + transfer_cost + surcharge_cost + car_rental_cost
-                savings = comparison_total - pack_price
-
-            except (ValueError, TypeError):
-                margin = 0
-                savings = 0
-                comparison_total = 0
+            pricing = compute_pricing(data)
 
             return jsonify({
                 'success': True, 
                 'form_data': data, 
                 'api_data': real_data,
-                'margin': margin,
-                'savings': savings,
-                'comparison_total': comparison_total
+                'api_inputs': RealAPIGatherer.source_inputs(data),
+                'margin': pricing['margin'],
+                'savings': pricing['savings'],
+                'comparison_total': pricing['comparison_total']
             })
         except Exception as e:
-            print(f"Erreur dans /api/generate-preview: {e}")
-            traceback.print_exc()
+            logger.exception("Erreur dans /api/generate-preview: %s", e)
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/generate-preview/stream', methods=['POST'])
+    def generate_preview_stream():
+        """Variante de generate-preview qui envoie les résultats au fil de l'eau (NDJSON)."""
+        try:
+            data = request.get_json(silent=True) or {}
+
+            required_fields = ['hotel_name', 'destination', 'date_start', 'date_end', 'hotel_b2b_price', 'hotel_b2c_price', 'pack_price']
+            if not all(field in data and data[field] for field in required_fields):
+                return jsonify({'success': False, 'error': 'Tous les champs requis ne sont pas remplis.'}), 400
+
+            # Calculé avant d'ouvrir le flux : une saisie invalide reçoit une erreur JSON classique
+            pricing = compute_pricing(data)
+        except Exception as e:
+            logger.exception("Erreur dans /api/generate-preview/stream: %s", e)
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+        def ndjson(event):
+            return fastjson.dumps(event) + '\n'
+
+        def generate():
+            yield ndjson({'event': 'pricing', 'form_data': data, **pricing})
+
+            try:
+                gatherer = RealAPIGatherer()
+                real_data = {}
+                for source, partial_data in gatherer.iter_real_data(data['hotel_name'], data['destination']):
+                    real_data.update(partial_data)
+                    yield ndjson({'event': 'source', 'source': source, 'api_data': partial_data})
+
+                yield ndjson({
+                    'event': 'done',
+                    'success': True,
+                    'form_data': data,
+                    'api_data': RealAPIGatherer.assemble_real_data(real_data),
+                    'api_inputs': RealAPIGatherer.source_inputs(data),
+                    **pricing
+                })
+            except Exception as e:
+                logger.exception("Erreur dans /api/generate-preview/stream: %s", e)
+                yield ndjson({'event': 'error', 'success': False, 'error': str(e)})
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     @app.route('/api/render-html-preview', methods=['POST'])
     def render_html_preview():
         if not check_auth():
@@ -212,12 +309,14 @@ def create_app(config_class=Config):
     def save_trip():
         data = request.get_json()
         form_data = data.get('form_data')
+        data.setdefault('api_inputs', RealAPIGatherer.source_inputs(form_data))
         
         new_trip = Trip(
-            full_data_json=json.dumps(data),
+            full_data=data,
             hotel_name=form_data.get('hotel_name'),
             destination=form_data.get('destination'),
             price=int(form_data.get('pack_price') or 0),
+            margin=compute_pricing(form_data)['margin'],
             status=data.get('status', 'proposed'),
             is_ultra_budget=form_data.get('is_ultra_budget', False)
         )
@@ -239,11 +338,13 @@ def create_app(config_class=Config):
             source_trip = Trip.query.get_or_404(trip_id)
             client_data = request.get_json()
 
+            # L'assignation partage l'offre source au lieu d'en recopier les données
             new_trip = Trip(
-                full_data_json=source_trip.full_data_json,
+                offer=source_trip.offer,
                 hotel_name=source_trip.hotel_name,
                 destination=source_trip.destination,
                 price=source_trip.price,
+                margin=source_trip.margin,
                 status='assigned',
                 is_ultra_budget=source_trip.is_ultra_budget,
                 client_first_name=client_data.get('client_first_name'),
@@ -256,25 +357,24 @@ def create_app(config_class=Config):
             db.session.add(new_trip)
             db.session.commit()
 
-            print(f"ℹ️ Tentative de publication du fichier pour le voyage {new_trip.id}...")
+            logger.info("ℹ️ Tentative de publication du fichier pour le voyage %s...", new_trip.id)
             client_filename = publication_service.publish_client_offer(new_trip)
             
             if client_filename:
                 new_trip.client_published_filename = client_filename
                 db.session.commit()
-                print(f"✅ Publication réussie: {client_filename}")
+                logger.info("✅ Publication réussie: %s", client_filename)
                 return jsonify({'success': True, 'message': 'Voyage assigné au client et page privée créée.'})
             else:
                 db.session.rollback() 
                 db.session.delete(new_trip)
                 db.session.commit()
-                print(f"❌ La publication a échoué. Le voyage {new_trip.id} a été annulé.")
+                logger.error("❌ La publication a échoué. Le voyage %s a été annulé.", new_trip.id)
                 return jsonify({'success': False, 'message': 'Le voyage n\'a pas pu être assigné car la publication du fichier sur le serveur a échoué. Vérifiez les logs de Railway pour les détails de l\'erreur réseau.'})
 
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur critique dans assign_trip_to_client: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Erreur critique dans assign_trip_to_client: %s", e)
             return jsonify({'success': False, 'message': f'Une erreur interne est survenue: {str(e)}'}), 500
 
     @app.route('/api/trips', methods=['GET'])
@@ -284,6 +384,79 @@ def create_app(config_class=Config):
         trips_data = [trip.to_dict() for trip in trips_query]
         return jsonify(trips_data)
 
+    @app.route('/api/trips/search', methods=['GET'])
+    def find_trips():
+        """Recherche plein texte (hôtel, destination, client), paginée et triée par pertinence."""
+        results = search_trips(
+            request.args.get('q', ''),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 20, type=int),
+            status=request.args.get('status') or None,
+        )
+        if results is None:
+            return jsonify({'success': False, 'message': 'Saisissez au moins un mot à rechercher.'}), 400
+        return jsonify({
+            'success': True,
+            'results': [trip.to_dict() for trip in results.items],
+            'total': results.total,
+            'page': results.page,
+            'pages': results.pages,
+        })
+
+    @app.route('/api/analytics', methods=['GET'])
+    def get_analytics():
+        """Statistiques de ventes agrégées en SQL, mises en cache quelques secondes."""
+        params = {
+            'bucket': request.args.get('bucket', 'month'),
+            'group_by': request.args.get('group_by') or None,
+            'date_field': request.args.get('date_field', 'created_at'),
+            'status': request.args.get('status') or None,
+            'date_from': request.args.get('from') or None,
+            'date_to': request.args.get('to') or None,
+        }
+        cache_key = tuple(sorted(params.items()))
+        try:
+            result, from_cache = cached(cache_key, app.config['ANALYTICS_CACHE_TTL'], lambda: {
+                'breakdown': sales_breakdown(**params),
+                'funnel': conversion_funnel(params['date_field'], params['status'], params['date_from'], params['date_to']),
+            })
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        return jsonify({'success': True, 'cached': from_cache, **result})
+
+    @app.route('/api/health/db', methods=['GET'])
+    def database_health():
+        """État du pool de connexions du worker et latence d'un aller-retour vers la base."""
+        try:
+            latency_ms = pool_monitor.ping()
+        except Exception as e:
+            logger.error("❌ Base de données injoignable: %s", e)
+            return jsonify({'success': False, 'message': str(e), 'pool': pool_monitor.status()}), 503
+        return jsonify({'success': True, 'latency_ms': latency_ms, 'pool': pool_monitor.status()})
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_export():
+        """Mesures du worker au format Prometheus (session connectée ou jeton METRICS_TOKEN)."""
+        token = app.config.get('METRICS_TOKEN')
+        authorization = request.headers.get('Authorization', '')
+        # Comparaison à temps constant : le jeton ne se devine pas caractère par caractère
+        token_ok = bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+        if not check_auth() and not token_ok:
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @app.route('/api/profiles', methods=['GET'])
+    def list_profiles():
+        """Profils capturés par ce worker, du plus récent au plus ancien."""
+        return jsonify({'success': True, 'profiles': profile_store.list()})
+
+    @app.route('/api/profiles/<path:filename>', methods=['GET'])
+    def download_profile(filename):
+        if not profile_store.is_valid_name(filename):
+            return jsonify({'success': False, 'message': 'Profil introuvable'}), 404
+        return send_from_directory(profile_store.directory, filename, as_attachment=not filename.endswith('.html'))
+
     @app.route('/api/trip/<int:trip_id>', methods=['GET'])
     def get_trip_details(trip_id):
         trip = Trip.query.get_or_404(trip_id)
@@ -322,33 +495,33 @@ def create_app(config_class=Config):
         new_form_data = request.get_json()
 
         try:
-            full_data = json.loads(trip.full_data_json)
+            full_data = copy.deepcopy(trip.full_data)
+
+            # Les anciens voyages n'ont pas d'api_inputs : leurs données ont été récupérées avec l'ancien formulaire.
+            previous_inputs = full_data.get('api_inputs') or RealAPIGatherer.source_inputs(full_data.get('form_data', {}))
+            api_data, api_inputs, refreshed_sources = RealAPIGatherer().refresh_stale_sources(
+                full_data.get('api_data', {}), previous_inputs, new_form_data
+            )
+            if refreshed_sources:
+                logger.info("ℹ️ Sources ré-interrogées pour le voyage %s: %s", trip.id, ', '.join(refreshed_sources))
+            full_data['api_data'] = api_data
+            full_data['api_inputs'] = api_inputs
             full_data['form_data'] = new_form_data
             
-            hotel_b2b_price = int(new_form_data.get('hotel_b2b_price') or 0)
-            hotel_b2c_price = int(new_form_data.get('hotel_b2c_price') or 0)
-            pack_price = int(new_form_data.get('pack_price') or 0)
-            flight_price = int(new_form_data.get('flight_price') or 0)
-            transfer_cost = int(new_form_data.get('transfer_cost') or 0)
-            surcharge_cost = int(new_form_data.get('surcharge_cost') or 0)
-            car_rental_cost = int(new_form_data.get('car_rental_cost') or 0)
-
-            total_cost_b2b = hotel_b2b_price + flight_price + transfer_cost + surcharge_cost + car_rental_cost
-            margin = pack_price - total_cost_b2b
-            
-            comparison_total = hotel_b2c_price + flight_price + transfer_cost + surcharge_cost + car_rental_cost
-            savings = comparison_total - pack_price
-            
-            full_data['margin'] = margin
-            full_data['comparison_total'] = comparison_total
-            full_data['savings'] = savings
+            pricing = compute_pricing(new_form_data)
+            full_data['margin'] = pricing['margin']
+            full_data['comparison_total'] = pricing['comparison_total']
+            full_data['savings'] = pricing['savings']
             
-            trip.price = pack_price
-            trip.full_data_json = json.dumps(full_data)
+            trip.price = int(new_form_data.get('pack_price') or 0)
+            trip.margin = pricing['margin']
+            trip.hotel_name = new_form_data.get('hotel_name') or trip.hotel_name
+            trip.destination = new_form_data.get('destination') or trip.destination
+            trip.full_data = full_data
             trip.is_ultra_budget = new_form_data.get('is_ultra_budget', False)
             
             if trip.status == 'assigned':
-                print(f"ℹ️ Mise à jour et republication du fichier client pour le voyage {trip.id}...")
+                logger.info("ℹ️ Mise à jour et republication du fichier client pour le voyage %s...", trip.id)
                 client_filename = publication_service.publish_client_offer(trip)
                 if client_filename:
                     trip.client_published_filename = client_filename
@@ -356,7 +529,7 @@ def create_app(config_class=Config):
                     return jsonify({'success': False, 'message': 'Les données ont été sauvegardées, mais la republication a échoué.'})
 
             elif trip.status == 'proposed' and trip.is_published:
-                print(f"ℹ️ Mise à jour et republication du fichier public pour le voyage {trip.id}...")
+                logger.info("ℹ️ Mise à jour et republication du fichier public pour le voyage %s...", trip.id)
                 public_filename = publication_service.publish_public_offer(trip)
                 if public_filename:
                     trip.published_filename = public_filename
@@ -367,11 +540,42 @@ def create_app(config_class=Config):
             return jsonify({'success': True, 'message': 'Offre mise à jour et republiée avec succès !'})
 
         except Exception as e:
-            print(f"❌ Erreur lors de la mise à jour du voyage {trip_id}: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Erreur lors de la mise à jour du voyage %s: %s", trip_id, e)
             db.session.rollback()
             return jsonify({'success': False, 'message': str(e)}), 500
 
+    @app.route('/api/trips/reprice', methods=['POST'])
+    def reprice_trips_bulk():
+        """Recalcule en masse les prix des voyages après un changement de coûts (vols, suppléments...)."""
+        data = request.get_json() or {}
+        trips_query = Trip.query
+        if data.get('trip_ids'):
+            trips_query = trips_query.filter(Trip.id.in_(data['trip_ids']))
+        elif data.get('status'):
+            trips_query = trips_query.filter_by(status=data['status'])
+        else:
+            return jsonify({'success': False, 'message': 'Indiquez trip_ids ou status.'}), 400
+
+        try:
+            # reprice_trips relit chaque payload : chargés avec les voyages plutôt qu'une requête par offre
+            trips = trips_query.options(joinedload(Trip.offer).undefer(TripOffer.payload)).all()
+            repriced = reprice_trips(trips, data.get('set'), data.get('adjust'))
+        except (ValueError, TypeError) as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        # Les pages déjà en ligne affichent l'ancien comparatif : elles doivent être republiées
+        republish_needed = [trip.id for trip in repriced if trip.is_published or trip.client_published_filename]
+        if any(trip.is_published for trip in repriced):
+            # Mise à jour groupée (bulk) : invisible pour la détection automatique du flux
+            feed_publisher.schedule()
+        return jsonify({
+            'success': True,
+            'message': f'{len(repriced)} voyage(s) recalculé(s).',
+            'repriced_count': len(repriced),
+            'republish_needed': republish_needed
+        })
+
     @app.route('/api/trip/<int:trip_id>', methods=['DELETE'])
     def delete_trip(trip_id):
         trip = Trip.query.get_or_404(trip_id)
@@ -423,8 +627,8 @@ def create_app(config_class=Config):
         if not trip.client_published_filename:
             return jsonify({'success': False, 'message': "L'offre pour ce client n'a pas de page privée publiée."}), 500
         
-        full_data = json.loads(trip.full_data_json)
-        header_photo = full_data.get('api_data', {}).get('photos', [None])[0]
+        api_data = trip.api_data
+        header_photo = preferred_image_url(api_data, api_data.get('photos', [None])[0])
         hotel_name_only = trip.hotel_name.split(',')[0].strip()
         client_first_name_only = trip.client_first_name.split(' ')[0].strip() if trip.client_first_name else ""
 
@@ -446,28 +650,17 @@ def create_app(config_class=Config):
             trip.balance_due_date = None
 
         try:
-            product_name = f"Voyage: {trip.hotel_name} pour {trip.client_first_name} {trip.client_last_name}"
-            
-            product = stripe.Product.create(name=product_name)
-            price = stripe.Price.create(
-                product=product.id,
-                unit_amount=amount_to_pay * 100,
-                currency="eur",
-            )
-            
-            checkout_session = stripe.checkout.Session.create(
-                line_items=[{'price': price.id, 'quantity': 1}],
-                mode='payment',
+            checkout_session = create_checkout_session(
+                trip,
+                amount_to_pay,
                 success_url=f"{app.config['SITE_PUBLIC_URL']}?payment=success&trip_id={trip.id}",
                 cancel_url=client_offer_url,
-                client_reference_id=trip.id,
-                customer_email=trip.client_email
             )
             trip.stripe_payment_link = checkout_session.url
             db.session.commit()
 
         except Exception as e:
-            print(f"❌ [Trip ID: {trip.id}] Erreur Stripe: {e}")
+            logger.error("❌ [Trip ID: %s] Erreur Stripe: %s", trip.id, e)
             db.session.rollback()
             return jsonify({'success': False, 'message': f'Erreur lors de la création du lien de paiement Stripe: {e}'}), 500
 
@@ -509,11 +702,11 @@ def create_app(config_class=Config):
                 recipients=[trip.client_email]
             )
             msg.html = email_html
-            mail.send(msg)
+            with metrics.upstream('smtp'):
+                mail.send(msg)
             
         except Exception as e:
-            print(f"❌ [Trip ID: {trip.id}] ERREUR DÉTAILLÉE LORS DE L'ENVOI DE L'EMAIL:")
-            traceback.print_exc()
+            logger.exception("❌ [Trip ID: %s] Erreur lors de l'envoi de l'email", trip.id)
             return jsonify({'success': False, 'message': f"Erreur lors de l'envoi de l'email: {str(e)}"}), 500
 
         return jsonify({'success': True, 'message': 'Offre envoyée avec succès par email !'})
@@ -530,10 +723,9 @@ def create_app(config_class=Config):
             return jsonify({'success': False, 'message': 'Le voyage doit être publié pour être partagé.'}), 400
 
         try:
-            full_data = json.loads(trip.full_data_json)
-            form_data = full_data.get('form_data', {})
-            api_data = full_data.get('api_data', {})
-            savings = full_data.get('savings', 0)
+            form_data = trip.form_data
+            api_data = trip.api_data
+            savings = trip.savings
             
             gatherer = RealAPIGatherer()
             catchphrase = gatherer.generate_whatsapp_catchphrase({
@@ -557,26 +749,30 @@ def create_app(config_class=Config):
             
             final_caption = "\n\n".join(caption_parts)
 
+            # Jamais l'URL Places brute (elle contient la clé API) : la déclinaison hébergée par le site
+            photo_url = (api_data.get('photos') or [None])[0]
+            derivatives = publication_service.ensure_image(trip, photo_url) if photo_url else None
+            if not derivatives:
+                return jsonify({'success': False, 'message': 'Aucune image trouvée pour ce voyage.'}), 400
+            db.session.commit()
+
             payload = {
-                "imageUrl": api_data.get('photos', [None])[0],
+                "imageUrl": urljoin(request.host_url, derivatives['src']),
                 "caption": final_caption,
                 "offerUrl": offer_url
             }
 
-            if not payload["imageUrl"]:
-                return jsonify({'success': False, 'message': 'Aucune image trouvée pour ce voyage.'}), 400
-
-            response = requests.post(n8n_webhook_url, json=payload, timeout=20)
+            with metrics.upstream('n8n') as call:
+                response = call.record(requests.post(n8n_webhook_url, json=payload, timeout=20))
             response.raise_for_status() 
 
             return jsonify({'success': True, 'message': 'Offre envoyée au canal WhatsApp !'})
 
         except requests.exceptions.RequestException as e:
-            print(f"❌ Erreur en contactant le webhook N8N: {e}")
+            logger.error("❌ Erreur en contactant le webhook N8N: %s", e)
             return jsonify({'success': False, 'message': 'Erreur de communication avec le service d\'envoi.'}), 500
         except Exception as e:
-            print(f"❌ Erreur inattendue dans send_whatsapp_offer: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Erreur inattendue dans send_whatsapp_offer: %s", e)
             return jsonify({'success': False, 'message': 'Une erreur interne est survenue.'}), 500
     
     @app.route('/api/trip/<int:trip_id>/finalize-sale', methods=['POST'])
@@ -613,8 +809,8 @@ def create_app(config_class=Config):
         try:
             client_name = f"{trip.client_first_name or ''} {trip.client_last_name or ''}".strip()
             hotel_name_only = trip.hotel_name.split(',')[0].strip()
-            full_data = json.loads(trip.full_data_json)
-            header_photo = full_data.get('api_data', {}).get('photos', [None])[0]
+            api_data = trip.api_data
+            header_photo = preferred_image_url(api_data, api_data.get('photos', [None])[0])
 
 
             msg = Message(
@@ -638,10 +834,10 @@ def create_app(config_class=Config):
                     data=file.read()
                 )
             
-            mail.send(msg)
+            with metrics.upstream('smtp'):
+                mail.send(msg)
         except Exception as e:
-            print("❌ Erreur lors de l'envoi de l'email de confirmation:")
-            traceback.print_exc()
+            logger.exception("❌ Erreur lors de l'envoi de l'email de confirmation")
             return jsonify({
                 'success': True, 
                 'message': 'Vente finalisée et documents uploadés, mais l\'envoi de l\'email de confirmation a échoué. Vous pouvez le renvoyer manuellement.'
@@ -662,8 +858,7 @@ def create_app(config_class=Config):
             sequence_number = invoices_today_count + 1
             invoice_number = f"{today_str}-{sequence_number:02d}"
 
-            full_data = json.loads(trip.full_data_json)
-            form_data = full_data.get('form_data', {})
+            form_data = trip.form_data
             
             start_date = datetime.strptime(form_data.get('date_start'), '%Y-%m-%d')
             end_date = datetime.strptime(form_data.get('date_end'), '%Y-%m-%d')
@@ -711,14 +906,14 @@ def create_app(config_class=Config):
                 content_type='application/pdf',
                 data=pdf_file
             )
-            mail.send(msg)
+            with metrics.upstream('smtp'):
+                mail.send(msg)
             
             return jsonify({'success': True, 'message': 'Facture générée et envoyée au client avec succès !'})
 
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Erreur lors de la génération de la facture: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Erreur lors de la génération de la facture: %s", e)
             return jsonify({'success': False, 'message': str(e)}), 500
 
     @app.route('/api/invoice/<int:invoice_id>/resend', methods=['POST'])
@@ -744,18 +939,41 @@ def create_app(config_class=Config):
                 content_type='application/pdf',
                 data=pdf_content
             )
-            mail.send(msg)
+            with metrics.upstream('smtp'):
+                mail.send(msg)
             
             return jsonify({'success': True, 'message': 'La facture a été renvoyée au client avec succès !'})
         
         except Exception as e:
-            print(f"❌ Erreur lors du renvoi de la facture: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Erreur lors du renvoi de la facture: %s", e)
             return jsonify({'success': False, 'message': str(e)}), 500
 
 
+    stripe_events_worker = StripeEventWorker(app, batch_size=app.config.get('STRIPE_EVENTS_BATCH_SIZE', 50),
+                                             claim_timeout=app.config.get('STRIPE_EVENTS_CLAIM_TIMEOUT', 600))
+    if app.config.get('STRIPE_WEBHOOK_SECRET'):
+        # Reprend dès le démarrage les événements en attente (sans webhook configuré, la file reste vide)
+        stripe_events_worker.start()
+
     @app.route('/stripe-webhook', methods=['POST'])
     def stripe_webhook():
+        # Réponse rapide : l'événement est vérifié et enregistré, le traitement se fait en arrière-plan
+        secret = app.config.get('STRIPE_WEBHOOK_SECRET')
+        if not secret:
+            logger.error("❌ Webhook Stripe reçu mais STRIPE_WEBHOOK_SECRET n'est pas configuré")
+            return jsonify(status='error', message='Webhook non configuré'), 500
+
+        payload = request.get_data()
+        try:
+            event = stripe.Webhook.construct_event(payload, request.headers.get('Stripe-Signature'), secret)
+        except ValueError:
+            return jsonify(status='error', message='Payload invalide'), 400
+        except stripe.SignatureVerificationError:
+            logger.warning("⚠️ Signature de webhook Stripe invalide")
+            return jsonify(status='error', message='Signature invalide'), 400
+
+        if record_event(event, payload):
+            stripe_events_worker.notify()
         return jsonify(status='success'), 200
 
     return app
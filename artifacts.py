@@ -0,0 +1,47 @@
+# artifacts.py - Pages publiées minifiées et précompressées (.gz, .br) pour l'hébergement web
+import gzip
+import re
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli est optionnel, seule la variante .gz est produite
+    brotli = None
+
+VARIANT_EXTENSIONS = ('.gz', '.br')
+
+# Contenus dont les espaces comptent : laissés tels quels (sauf l'indentation des scripts)
+_PROTECTED_RE = re.compile(r'(<(script|pre|textarea)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+_COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+_LINE_BREAK_RE = re.compile(r'[ \t\r\f\v]*\n\s*')
+_SPACES_RE = re.compile(r'[ \t\r\f\v]+')
+_INDENT_RE = re.compile(r'\n[ \t]+')
+
+
+def minify_html(html):
+    """Minification prudente : supprime commentaires et indentation sans toucher au rendu.
+
+    Les espaces entre balises sont conservés (un seul suffit) : entre deux éléments en ligne,
+    ils sont visibles à l'écran.
+    """
+    parts = []
+    for index, chunk in enumerate(_PROTECTED_RE.split(html)):
+        position = index % 3
+        if position == 2:
+            continue  # nom de balise capturé par le groupe 2
+        if position == 1:
+            parts.append(_INDENT_RE.sub('\n', chunk) if chunk[:7].lower() == '<script' else chunk)
+            continue
+        chunk = _COMMENT_RE.sub('', chunk)
+        chunk = _LINE_BREAK_RE.sub('\n', chunk)
+        parts.append(_SPACES_RE.sub(' ', chunk))
+    return ''.join(parts).strip()
+
+
+def compressed_variants(content_bytes):
+    """Retourne {extension: contenu} pour les variantes précompressées d'un fichier."""
+    # mtime=0 : même page, mêmes octets (pas de réupload inutile, ETag stable)
+    variants = {'.gz': gzip.compress(content_bytes, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content_bytes, mode=brotli.MODE_TEXT, quality=11)
+    return variants
+
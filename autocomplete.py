@@ -0,0 +1,248 @@
+# autocomplete.py - Suggestions d'hôtels côté serveur : trie de préfixes devant Places Autocomplete
+import logging
+import os
+import threading
+import time
+
+import requests
+import unidecode
+from sqlalchemy import func
+
+import metrics
+from models import db, Trip
+from services import PLACES_API_BASE
+
+logger = logging.getLogger(__name__)
+
+# Pas d'appel à Places en dessous de cette longueur (trop de résultats, quota gaspillé)
+MIN_QUERY_LENGTH = 3
+SOLD_RANK_BASE = 1000  # les hôtels déjà vendus passent devant les résultats Places
+
+
+def normalize(text):
+    """Minuscules sans accents ni ponctuation : 'Hôtel Ibis-Paris' -> 'hotel ibis paris'."""
+    stripped = ''.join(c if c.isalnum() else ' ' for c in unidecode.unidecode(text or ''))
+    return ' '.join(stripped.lower().split())
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # [(rang, clé)] triés par rang décroissant, au plus `width`
+
+
+class PrefixTrie:
+    """Trie dont chaque nœud garde les meilleures clés : une recherche coûte O(longueur du préfixe).
+
+    Chaque texte est indexé à partir de chacun de ses mots ('ibis paris' répond à 'par').
+    """
+
+    def __init__(self, width=10):
+        self.width = width
+        self.root = _Node()
+
+    def insert(self, text, key, rank):
+        words = normalize(text).split(' ')
+        for start in range(len(words)):
+            node = self.root
+            for char in ' '.join(words[start:]):
+                node = node.children.setdefault(char, _Node())
+                self._offer(node, key, rank)
+
+    def _offer(self, node, key, rank):
+        for index, (existing_rank, existing_key) in enumerate(node.top):
+            if existing_key == key:
+                if existing_rank >= rank:
+                    return
+                del node.top[index]
+                break
+        if len(node.top) >= self.width and rank <= node.top[-1][0]:
+            return
+        node.top.append((rank, key))
+        node.top.sort(key=lambda item: -item[0])
+        del node.top[self.width:]
+
+    def search(self, prefix):
+        node = self.root
+        for char in normalize(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [key for _, key in node.top]
+
+
+class HotelAutocomplete:
+    """Proxy de Places Autocomplete (type lodging) avec jetons de session et cache en mémoire.
+
+    Le trie contient les hôtels déjà vendus (Trip.hotel_name) et les prédictions Places récentes.
+    Une saisie est servie localement si le trie a assez de suggestions, ou si un préfixe de la
+    saisie a déjà reçu une réponse complète de Places (moins de `limit` prédictions).
+    """
+
+    def __init__(self, api_key, api_base, limit=5, ttl=3600, max_entries=5000, sold_refresh=600):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.limit = limit
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sold_refresh = sold_refresh
+        self._lock = threading.Lock()
+        self._trie = PrefixTrie(width=limit * 2)
+        self._items = {}       # clé -> suggestion (+ 'expires_at' pour les résultats Places)
+        self._exhaustive = {}  # saisie normalisée -> échéance
+        self._details = {}     # place_id -> (échéance, détails)
+        self._sold_loaded_at = None
+
+    # --- Hôtels déjà vendus ---
+
+    def _load_sold_hotels(self):
+        rows = (db.session.query(Trip.hotel_name, func.max(Trip.destination), func.count(Trip.id))
+                .group_by(Trip.hotel_name).all())
+        with self._lock:
+            for hotel_name, destination, count in rows:
+                key = f"sold:{normalize(hotel_name)}"
+                self._items[key] = {'description': hotel_name, 'place_id': None,
+                                    'destination': destination, 'source': 'sold'}
+                self._trie.insert(hotel_name, key, SOLD_RANK_BASE + count)
+            self._sold_loaded_at = time.monotonic()
+        logger.debug("🏨 %d hôtels vendus chargés dans l'autocomplétion", len(rows))
+
+    def _refresh_sold_hotels(self):
+        if self._sold_loaded_at is None or time.monotonic() - self._sold_loaded_at > self.sold_refresh:
+            self._load_sold_hotels()
+
+    # --- Recherche ---
+
+    def _local(self, query, now):
+        with self._lock:
+            suggestions = []
+            for key in self._trie.search(query):
+                item = self._items.get(key)
+                if item is not None and item.get('expires_at', now + 1) > now:
+                    suggestions.append(item)
+            return suggestions[:self.limit]
+
+    def _covered(self, query, now):
+        # Places ne renvoie que des hôtels contenant la saisie : une réponse incomplète pour
+        # 'hilton pa' contient déjà tout ce que 'hilton par' pourrait renvoyer
+        with self._lock:
+            return any(self._exhaustive.get(query[:end], 0) > now
+                       for end in range(MIN_QUERY_LENGTH, len(query) + 1))
+
+    def suggest(self, query, session_token=None):
+        """Retourne (suggestions, source) avec source 'local' ou 'places'."""
+        normalized = normalize(query)
+        if len(normalized) < MIN_QUERY_LENGTH:
+            return [], 'local'
+        self._refresh_sold_hotels()
+
+        now = time.monotonic()
+        local = self._local(normalized, now)
+        if len(local) >= self.limit or self._covered(normalized, now):
+            metrics.record_cache('autocomplete', True)
+            return local, 'local'
+        metrics.record_cache('autocomplete', False)
+
+        predictions = self._fetch_predictions(query, session_token)
+        if predictions is None:
+            return local, 'local'  # Places indisponible : on garde ce que l'on a
+        self._remember(normalized, predictions, now)
+
+        merged = [item for item in local if item['source'] == 'sold']
+        seen = {item['description'] for item in merged}
+        for item in predictions:
+            if item['description'] not in seen and len(merged) < self.limit:
+                merged.append(item)
+                seen.add(item['description'])
+        return merged, 'places'
+
+    def _fetch_predictions(self, query, session_token):
+        if not self.api_key:
+            return None
+        params = {'input': query, 'types': 'lodging', 'language': 'fr', 'key': self.api_key}
+        if session_token:
+            params['sessiontoken'] = session_token
+        try:
+            with metrics.upstream('places') as call:
+                response = call.record(requests.get(f"{self.api_base}/autocomplete/json", params=params, timeout=5))
+                response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("⚠️ Autocomplétion Places indisponible: %s", e)
+            return None
+        if data.get('status') not in ('OK', 'ZERO_RESULTS'):
+            logger.warning("⚠️ Autocomplétion Places refusée: %s", data.get('status'))
+            return None
+        return [{'description': prediction.get('description', ''), 'place_id': prediction.get('place_id'),
+                 'destination': None, 'source': 'places'}
+                for prediction in data.get('predictions', [])]
+
+    def _remember(self, normalized, predictions, now):
+        expires_at = now + self.ttl
+        with self._lock:
+            if len(predictions) < self.limit:
+                self._exhaustive[normalized] = expires_at
+            for position, item in enumerate(predictions):
+                key = item['place_id'] or item['description']
+                self._items[key] = dict(item, expires_at=expires_at)
+                self._trie.insert(item['description'], key, self.limit - position)
+            if len(self._items) > self.max_entries:
+                self._compact(now)
+
+    def _compact(self, now):
+        # Le trie ne sait pas retirer une clé : on le reconstruit avec la moitié la plus récente
+        recent = sorted((item for item in self._items.values() if 'expires_at' in item and item['expires_at'] > now),
+                        key=lambda item: item['expires_at'], reverse=True)[:self.max_entries // 2]
+        self._items = {key: item for key, item in self._items.items() if 'expires_at' not in item}
+        self._exhaustive = {query: expires_at for query, expires_at in self._exhaustive.items() if expires_at > now}
+        self._trie = PrefixTrie(width=self.limit * 2)
+        for item in recent:
+            self._items[item['place_id'] or item['description']] = item
+            self._trie.insert(item['description'], item['place_id'] or item['description'], self.limit)
+        self._sold_loaded_at = None  # les hôtels vendus seront réinsérés à la prochaine saisie
+        logger.info("🧹 Autocomplétion compactée: %d prédictions conservées", len(recent))
+
+    # --- Détails (clôture de la session) ---
+
+    def details(self, place_id, session_token=None):
+        """Nom, note et adresse d'un hôtel choisi. L'appel avec le jeton clôt la session Places."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._details.get(place_id)
+        if cached and cached[0] > now:
+            metrics.record_cache('autocomplete_details', True)
+            return cached[1]
+        metrics.record_cache('autocomplete_details', False)
+        if not self.api_key:
+            return None
+
+        params = {'place_id': place_id, 'fields': 'name,rating,address_components', 'language': 'fr', 'key': self.api_key}
+        if session_token:
+            params['sessiontoken'] = session_token
+        try:
+            with metrics.upstream('places') as call:
+                response = call.record(requests.get(f"{self.api_base}/details/json", params=params, timeout=5))
+                response.raise_for_status()
+            result = response.json().get('result')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("⚠️ Détails Places indisponibles pour %s: %s", place_id, e)
+            return None
+        if result is None:
+            return None
+        with self._lock:
+            if len(self._details) >= self.max_entries:
+                self._details = {key: value for key, value in self._details.items() if value[0] > now}
+            self._details[place_id] = (now + self.ttl, result)
+        return result
+
+
+def init_hotel_autocomplete(app):
+    autocomplete = HotelAutocomplete(
+        app.config.get('GOOGLE_API_KEY'), os.environ.get('PLACES_API_BASE') or PLACES_API_BASE,
+        ttl=app.config.get('AUTOCOMPLETE_TTL', 3600),
+        max_entries=app.config.get('AUTOCOMPLETE_MAX_ENTRIES', 5000),
+    )
+    app.extensions['hotel_autocomplete'] = autocomplete
+    return autocomplete
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Octets économisés par la minification et la précompression des pages d'offre
+À exécuter depuis la racine du projet : python -m benchmarks.bench_artifacts [--trips 50]
+
+Chaque voyage de test est rendu par generate_travel_page_html puis comparé sous quatre formes :
+HTML brut (avant), HTML minifié, minifié + gzip -9 et minifié + brotli 11.
+"""
+import argparse
+import os
+import sys
+import time
+
+from artifacts import brotli, compressed_variants, minify_html
+from benchmarks.fixtures import make_trip_payloads
+from services import OFFER_CSS_PATH, generate_travel_page_html
+
+
+def render_pages(count, seed):
+    pages = []
+    for payload in make_trip_payloads(count, seed=seed):
+        pages.append(generate_travel_page_html(
+            payload['form_data'], payload['api_data'], payload['savings'], payload['comparison_total']))
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trips', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=2025)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(OFFER_CSS_PATH):
+        print("ℹ️ Feuille purgée absente (python build_offer_css.py) : les pages pointent vers le CDN Tailwind\n")
+    if brotli is None:
+        print("⚠️ Brotli n'est pas installé : seule la variante .gz est mesurée\n")
+
+    pages = [page.encode('utf-8') for page in render_pages(args.trips, args.seed)]
+
+    start = time.perf_counter()
+    minified = [minify_html(page.decode('utf-8')).encode('utf-8') for page in pages]
+    minify_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    variants = [compressed_variants(page) for page in minified]
+    compress_seconds = time.perf_counter() - start
+
+    totals = {
+        'HTML brut': sum(len(page) for page in pages),
+        'minifié': sum(len(page) for page in minified),
+        'minifié + .gz': sum(len(v['.gz']) for v in variants),
+    }
+    if brotli is not None:
+        totals['minifié + .br'] = sum(len(v['.br']) for v in variants)
+
+    raw_total = totals['HTML brut']
+    print(f"{args.trips} pages d'offre")
+    print(f"{'Forme':<16} {'total Ko':>10} {'Ko/page':>9} {'gain':>8}")
+    print('-' * 46)
+    for name, size in totals.items():
+        print(f"{name:<16} {size / 1024:>10.1f} {size / 1024 / args.trips:>9.1f} {(1 - size / raw_total) * 100:>7.1f}%")
+    print(f"\nMinification : {minify_seconds / args.trips * 1000:.2f} ms/page, "
+          f"compression : {compress_seconds / args.trips * 1000:.2f} ms/page")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
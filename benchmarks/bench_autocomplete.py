@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Appels Places et latence de l'autocomplétion des hôtels servie par l'application
+À exécuter depuis la racine du projet : python -m benchmarks.bench_autocomplete [--sessions 200]
+
+Des opérateurs saisissent des noms d'hôtels caractère par caractère (une partie déjà vendus,
+le reste inconnus). Sans le proxy, chaque caractère à partir du troisième coûte une requête
+Places Autocomplete facturée ; avec lui, seules les saisies absentes du trie atteignent Places.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.bench_flows import percentile
+from benchmarks.fake_upstreams import AUTOCOMPLETE_HOTELS, FakeUpstreams, Knob
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--sold', type=int, default=40, help="voyages déjà enregistrés en base")
+    parser.add_argument('--sold-share', type=float, default=0.5, help="part des saisies portant sur un hôtel déjà vendu")
+    parser.add_argument('--seed', type=int, default=2025)
+    args = parser.parse_args(argv)
+
+    upstreams = FakeUpstreams(knobs={'places': Knob(latency=0.0, jitter=0)}, seed=args.seed).start()
+    workdir = tempfile.mkdtemp(prefix='odyssee-bench-')
+    os.environ.update(upstreams.environ())
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL') or 'WARNING',
+    })
+
+    from app import create_app
+    from autocomplete import MIN_QUERY_LENGTH
+    from models import db
+    from benchmarks.fixtures import make_trip_payload
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    sold_hotels = rng.sample(AUTOCOMPLETE_HOTELS, args.sold)
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['authenticated'] = True
+        for hotel_name in sold_hotels:
+            payload = make_trip_payload(rng)
+            payload['form_data']['hotel_name'] = hotel_name
+            client.post('/api/trips', json=payload)
+
+        autocomplete = app.extensions['hotel_autocomplete']
+        upstreams.reset_counters()
+        keystrokes, local_seconds, remote_seconds = 0, [], []
+        for _ in range(args.sessions):
+            pool = sold_hotels if rng.random() < args.sold_share else AUTOCOMPLETE_HOTELS
+            name = rng.choice(pool).split(',')[0]
+            token = str(uuid.uuid4())
+            for end in range(MIN_QUERY_LENGTH, len(name) + 1):
+                keystrokes += 1
+                start = time.perf_counter()
+                _, source = autocomplete.suggest(name[:end], token)
+                (local_seconds if source == 'local' else remote_seconds).append(time.perf_counter() - start)
+        db.session.remove()
+
+    upstreams.stop()
+    places_calls = upstreams.calls['places']
+    local_seconds.sort()
+    remote_seconds.sort()
+    print(f"{args.sessions} saisies, {keystrokes} requêtes d'autocomplétion ({len(sold_hotels)} hôtels en base)")
+    print(f"Appels Places sans proxy : {keystrokes}")
+    print(f"Appels Places avec proxy : {places_calls} ({(1 - places_calls / keystrokes) * 100:.1f}% évités)")
+    if local_seconds:
+        print(f"Réponses locales : p50 {percentile(local_seconds, 50) * 1e6:.0f} µs, "
+              f"p99 {percentile(local_seconds, 99) * 1e6:.0f} µs")
+    if remote_seconds:
+        print(f"Réponses via Places (serveur local sans latence) : p50 {percentile(remote_seconds, 50) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout des parcours principaux avec des services externes simulés
+À exécuter depuis la racine du projet : python -m benchmarks.bench_flows [--iterations 10]
+
+Parcours mesurés : generate-preview, save, publish, assign, send-offer, finalize et invoice.
+Places, YouTube, Gemini, upload.php, SMTP, Stripe et n8n sont remplacés par des serveurs
+locaux (benchmarks/fake_upstreams.py) dont la latence et le taux d'échec sont réglables :
+    --latency gemini=0.8 --failure-rate upload=0.05
+
+Les résultats sont enregistrés dans benchmarks/results/ et comparés à la mesure précédente.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.fake_upstreams import FakeUpstreams, Knob, SERVICES, DEFAULT_LATENCIES
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+FLOWS = ('generate-preview', 'save', 'publish', 'assign', 'send-offer', 'finalize', 'invoice')
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (valeurs déjà triées)."""
+    if not values:
+        return None
+    rank = max(1, round(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(durations, errors, elapsed):
+    durations = sorted(durations)
+    return {
+        'count': len(durations),
+        'errors': errors,
+        'p50_ms': round(percentile(durations, 50) * 1000, 1),
+        'p99_ms': round(percentile(durations, 99) * 1000, 1),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 1),
+        'throughput_rps': round(len(durations) / elapsed, 2) if elapsed else None,
+    }
+
+
+def _is_error(response):
+    if response.status_code >= 400:
+        return True
+    if response.is_json and isinstance(response.json, dict):
+        return response.json.get('success') is False
+    return False
+
+
+def _parse_knobs(values, option):
+    """['places=0.2', ...] -> {'places': 0.2} ; `option` ('--latency'...) nomme l'option fautive."""
+    knobs = {}
+    for value in values or []:
+        name, _, number = value.partition('=')
+        if name not in SERVICES:
+            raise SystemExit(f"{option} {value} : service inconnu {name} (attendus : {', '.join(SERVICES)})")
+        try:
+            knobs[name] = float(number)
+        except ValueError:
+            raise SystemExit(f"{option} {value} : nombre attendu après '=' (ex. {option} {name}=0.2)")
+    return knobs
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous_results():
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, 'flows-*.json')))
+    if not files:
+        return None
+    with open(files[-1]) as f:
+        return json.load(f)
+
+
+def run(iterations, knobs, seed):
+    upstreams = FakeUpstreams(knobs=knobs, seed=seed).start()
+    workdir = tempfile.mkdtemp(prefix='odyssee-bench-')
+    os.environ.update(upstreams.environ())
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'IMAGE_CACHE_DIR': os.path.join(workdir, 'images'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL') or 'WARNING',
+    })
+
+    from app import create_app
+    from config import Config
+    from models import db, Trip
+    from benchmarks.fixtures import make_trip_payload, make_client
+
+    class BenchConfig(Config):
+        # Le serveur SMTP local ne parle ni TLS ni SSL
+        MAIL_USE_TLS = False
+        MAIL_USE_SSL = False
+
+    app = create_app(BenchConfig)
+    rng = random.Random(seed)
+    results = {}
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['authenticated'] = True
+
+        previews, saved_ids, assigned_ids = [], [], []
+        state = {'publish_index': 0, 'assign_index': 0, 'send_index': 0, 'finalize_index': 0, 'invoice_index': 0}
+
+        def next_id(ids, key):
+            value = ids[state[key] % len(ids)]
+            state[key] += 1
+            return value
+
+        def flow_generate_preview():
+            form_data = make_trip_payload(rng)['form_data']
+            response = client.post('/api/generate-preview', json=form_data)
+            if response.status_code == 200 and response.json.get('success'):
+                previews.append(response.json)
+            return response
+
+        def flow_save():
+            payload = previews[len(saved_ids) % len(previews)] if previews else make_trip_payload(rng)
+            response = client.post('/api/trips', json=payload)
+            if response.status_code == 200 and response.json.get('success'):
+                saved_ids.append(response.json['trip']['id'])
+            return response
+
+        def flow_publish():
+            return client.post(f"/api/trip/{next_id(saved_ids, 'publish_index')}/publish", json={'publish': True})
+
+        def flow_assign():
+            trip_id = next_id(saved_ids, 'assign_index')
+            response = client.post(f'/api/trip/{trip_id}/assign', json=make_client(rng))
+            if not _is_error(response):
+                newest = Trip.query.filter_by(status='assigned').order_by(Trip.id.desc()).first()
+                assigned_ids.append(newest.id)
+            return response
+
+        def flow_send_offer():
+            # Les voyages reviennent en boucle : à partir du deuxième envoi, seul le checkout est créé
+            return client.post(f"/api/trip/{next_id(assigned_ids, 'send_index')}/send-offer", json={'payment_type': 'total'})
+
+        def flow_finalize():
+            return client.post(
+                f"/api/trip/{next_id(assigned_ids, 'finalize_index')}/finalize-sale",
+                data={'documents': (io.BytesIO(b'%PDF-1.4 billet'), 'billet.pdf')},
+                content_type='multipart/form-data')
+
+        def flow_invoice():
+            return client.post(f"/api/trip/{next_id(assigned_ids, 'invoice_index')}/generate-invoice",
+                               json={'client_name': 'Client Benchmark', 'client_address': 'Rue du Test 1, 1000 Bruxelles'})
+
+        flows = {
+            'generate-preview': flow_generate_preview,
+            'save': flow_save,
+            'publish': flow_publish,
+            'assign': flow_assign,
+            'send-offer': flow_send_offer,
+            'finalize': flow_finalize,
+            'invoice': flow_invoice,
+        }
+
+        for name in FLOWS:
+            if name in ('publish', 'assign') and not saved_ids or name in ('send-offer', 'finalize', 'invoice') and not assigned_ids:
+                results[name] = {'skipped': 'aucun voyage disponible (échecs en amont)'}
+                continue
+            upstreams.reset_counters()
+            durations, errors = [], 0
+            flow_start = time.perf_counter()
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = flows[name]()
+                durations.append(time.perf_counter() - start)
+                errors += _is_error(response)
+                db.session.remove()
+            results[name] = summarize(durations, errors, time.perf_counter() - flow_start)
+            results[name]['upstream_calls'] = {k: v for k, v in upstreams.calls.items() if v}
+            results[name]['upstream_failures'] = {k: v for k, v in upstreams.failures.items() if v}
+
+    upstreams.stop()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--latency', action='append', metavar='SERVICE=SECONDES',
+                        help='latence moyenne d\'un service (répétable)')
+    parser.add_argument('--failure-rate', action='append', metavar='SERVICE=TAUX',
+                        help='proportion d\'appels en échec pour un service (répétable)')
+    parser.add_argument('--no-save', action='store_true', help='ne pas enregistrer les résultats')
+    args = parser.parse_args(argv)
+
+    latencies = {**DEFAULT_LATENCIES, **_parse_knobs(args.latency, '--latency')}
+    failure_rates = _parse_knobs(args.failure_rate, '--failure-rate')
+    knobs = {name: Knob(latency=latencies[name], failure_rate=failure_rates.get(name, 0.0)) for name in SERVICES}
+
+    previous = _previous_results()
+    results = run(args.iterations, knobs, args.seed)
+
+    print(f"{'Parcours':<18} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'erreurs':>8} {'Δ p50':>8}")
+    print('-' * 66)
+    for name in FLOWS:
+        result = results[name]
+        if 'skipped' in result:
+            print(f"{name:<18} ignoré : {result['skipped']}")
+            continue
+        delta = ''
+        previous_flow = (previous or {}).get('flows', {}).get(name) or {}
+        if previous_flow.get('p50_ms'):
+            delta = f"{(result['p50_ms'] / previous_flow['p50_ms'] - 1) * 100:+.0f}%"
+        print(f"{name:<18} {result['p50_ms']:>9} {result['p99_ms']:>9} {result['throughput_rps']:>8} {result['errors']:>8} {delta:>8}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        path = os.path.join(RESULTS_DIR, f'flows-{timestamp}.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'timestamp': timestamp,
+                'git_revision': _git_revision(),
+                'python': platform.python_version(),
+                'iterations': args.iterations,
+                'knobs': {name: vars(knob) for name, knob in knobs.items()},
+                'flows': results,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats enregistrés dans {os.path.relpath(path)}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare le module json standard et orjson sur les données de voyage
+À exécuter depuis la racine du projet : python -m benchmarks.bench_json
+
+Mesure la sérialisation/désérialisation des payloads complets (stockage des offres)
+et le débit de GET /api/trips avec les deux fournisseurs JSON de Flask.
+"""
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import fastjson
+from benchmarks.fixtures import make_trip_payloads
+
+NUM_PAYLOADS = 200
+NUM_TRIPS = 300
+ROUNDS = 20
+
+
+def _best_of(func, rounds=5):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_payloads():
+    payloads = make_trip_payloads(NUM_PAYLOADS)
+    encoded = [json.dumps(p) for p in payloads]
+    total_kb = sum(len(e) for e in encoded) / 1024
+
+    results = [
+        ('json.dumps', _best_of(lambda: [json.dumps(p) for p in payloads])),
+        ('fastjson.dumps', _best_of(lambda: [fastjson.dumps(p) for p in payloads])),
+        ('json.loads', _best_of(lambda: [json.loads(e) for e in encoded])),
+        ('fastjson.loads', _best_of(lambda: [fastjson.loads(e) for e in encoded])),
+    ]
+    print(f"{NUM_PAYLOADS} payloads ({total_kb:.0f} Ko au total)")
+    print(f"{'Opération':<18} {'ms':>9} {'Mo/s':>9}")
+    print('-' * 38)
+    for name, seconds in results:
+        print(f"{name:<18} {seconds * 1000:>9.1f} {total_kb / 1024 / seconds:>9.1f}")
+
+
+def bench_jsonify():
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['authenticated'] = True
+        for payload in make_trip_payloads(NUM_TRIPS):
+            client.post('/api/trips', json=payload)
+
+        print(f"\nGET /api/trips ({NUM_TRIPS} voyages, {ROUNDS} requêtes)")
+        print(f"{'Fournisseur':<22} {'req/s':>9}")
+        print('-' * 32)
+        for name, provider in (('json (Flask)', DefaultJSONProvider(app)), ('orjson (fastjson)', fastjson.FastJSONProvider(app))):
+            app.json = provider
+            client.get('/api/trips')
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                client.get('/api/trips')
+            elapsed = time.perf_counter() - start
+            print(f"{name:<22} {ROUNDS / elapsed:>9.1f}")
+
+
+def main():
+    if fastjson.orjson is None:
+        print("⚠️ orjson n'est pas installé : fastjson utilise le module json standard")
+    bench_payloads()
+    bench_jsonify()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compte le nombre de décodages JSON des données de voyage par requête
+À exécuter depuis la racine du projet : python -m benchmarks.bench_parse_counts
+
+Les appels externes (upload, Stripe, email, N8N, Gemini) sont remplacés par des doublures
+pour ne mesurer que le travail fait par l'application.
+"""
+import io
+import os
+import sys
+import random
+import types
+from unittest import mock
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import fastjson
+import models
+from benchmarks.fixtures import make_trip_payloads, make_client
+
+NUM_TRIPS = 50
+# Déclinaison renvoyée par le pipeline d'images simulé (aucun téléchargement ni encodage)
+FAKE_DERIVATIVES = {'width': 800, 'height': 533, 'src': '/images/photo-800.jpg',
+                    'sources': {'webp': [[800, '/images/photo-800.webp']], 'jpg': [[800, '/images/photo-800.jpg']]}}
+
+
+class CountingJSON(types.ModuleType):
+    """Remplace la couche JSON de models.py pour compter les décodages."""
+
+    def __init__(self):
+        super().__init__('fastjson')
+        self.loads_count = 0
+
+    def __getattr__(self, name):
+        return getattr(fastjson, name)
+
+    def loads(self, *args, **kwargs):
+        self.loads_count += 1
+        return fastjson.loads(*args, **kwargs)
+
+
+def main():
+    from app import create_app, mail
+    from models import db, Trip
+
+    app = create_app()
+    app.config['N8N_WHATSAPP_WEBHOOK'] = 'http://n8n.invalid/webhook'
+    counter = CountingJSON()
+
+    with app.app_context(), \
+            mock.patch.object(models, 'fastjson', counter), \
+            mock.patch('services.PublicationService._upload_via_api', return_value=True), \
+            mock.patch('images.ImagePipeline.process', return_value=FAKE_DERIVATIVES), \
+            mock.patch('services.RealAPIGatherer.generate_whatsapp_catchphrase', return_value='Offre !'), \
+            mock.patch('app.requests.post', return_value=mock.Mock(status_code=200)), \
+            mock.patch.object(mail, 'send'), \
+            mock.patch('stripe.Product.create', return_value=types.SimpleNamespace(id='prod_x')), \
+            mock.patch('stripe.Price.create', return_value=types.SimpleNamespace(id='price_x')), \
+            mock.patch('stripe.checkout.Session.create', return_value=types.SimpleNamespace(url='https://pay.example/x')):
+        db.create_all()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['authenticated'] = True
+
+        for payload in make_trip_payloads(NUM_TRIPS):
+            client.post('/api/trips', json=payload)
+        db.session.remove()
+
+        trip = Trip.query.first()
+        trip_id = trip.id
+        client.post(f'/api/trip/{trip_id}/publish', json={'publish': True})
+        client.post(f'/api/trip/{trip_id}/assign', json=make_client(random.Random(1)))
+        assigned_id = Trip.query.filter_by(status='assigned').first().id
+        db.session.remove()
+
+        scenarios = [
+            ('GET /api/published-trips', lambda: client.get('/api/published-trips')),
+            ('GET /api/trips', lambda: client.get('/api/trips?status=proposed')),
+            ('POST publish', lambda: client.post(f'/api/trip/{trip_id}/publish', json={'publish': True})),
+            ('POST send-whatsapp', lambda: client.post(f'/api/trip/{trip_id}/send-whatsapp')),
+            ('POST send-offer', lambda: client.post(f'/api/trip/{assigned_id}/send-offer', json={'payment_type': 'total'})),
+            ('POST finalize-sale', lambda: client.post(
+                f'/api/trip/{assigned_id}/finalize-sale',
+                data={'documents': (io.BytesIO(b'%PDF-1.4'), 'billet.pdf')},
+                content_type='multipart/form-data')),
+            ('POST generate-invoice', lambda: client.post(f'/api/trip/{assigned_id}/generate-invoice', json={'client_name': 'Client'})),
+        ]
+
+        print(f"{'Requête':<28} {'HTTP':>5} {'décodages':>11}")
+        print('-' * 46)
+        for name, call in scenarios:
+            db.session.remove()
+            counter.loads_count = 0
+            response = call()
+            print(f"{name:<28} {response.status_code:>5} {counter.loads_count:>11}")
+        print(f"\n{NUM_TRIPS} voyages en base ; au plus un décodage par offre distincte est attendu.")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Serveurs locaux qui remplacent les services externes pendant les benchmarks
+Places (recherche, détails, autocomplétion), YouTube, Gemini (REST), upload.php, Stripe et n8n
+sur un serveur HTTP, plus un serveur SMTP.
+upload.php garde les fichiers reçus en mémoire et sait les lister (GET ?action=list&directory=...).
+Chaque service a sa latence et son taux d'échec réglables.
+"""
+import base64
+import hashlib
+import io
+import json
+import random
+import socketserver
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from unidecode import unidecode
+
+from benchmarks.fixtures import DESTINATIONS, HOTEL_PREFIXES, HOTEL_SUFFIXES
+
+SERVICES = ('places', 'youtube', 'gemini', 'upload', 'stripe', 'n8n', 'smtp')
+
+# Latences par défaut proches de celles observées en production (en secondes)
+DEFAULT_LATENCIES = {
+    'places': 0.12,
+    'youtube': 0.15,
+    'gemini': 1.5,
+    'upload': 0.25,
+    'stripe': 0.3,
+    'n8n': 0.1,
+    'smtp': 0.2,
+}
+
+# Catalogue d'hôtels de l'autocomplétion Places simulée
+AUTOCOMPLETE_HOTELS = [f'{prefix} {suffix}, {destination}'
+                       for prefix in HOTEL_PREFIXES for suffix in HOTEL_SUFFIXES for destination in DESTINATIONS]
+
+
+@dataclass
+class Knob:
+    latency: float = 0.0
+    jitter: float = 0.2
+    failure_rate: float = 0.0
+
+    def apply(self, rng):
+        """Attend la latence configurée et indique si l'appel doit échouer."""
+        delay = self.latency * (1 + rng.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+        return rng.random() < self.failure_rate
+
+
+def _make_photo():
+    from PIL import Image
+    image = Image.new('RGB', (1200, 800))
+    pixels = image.load()
+    for x in range(0, 1200, 4):
+        for y in range(0, 800, 4):
+            pixels[x, y] = (x % 256, y % 256, (x * y) % 256)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def _photo_references(rng, count):
+    return [{'photo_reference': uuid.UUID(int=rng.getrandbits(128)).hex * 4} for _ in range(count)]
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _dispatch(self):
+        upstreams = self.server.upstreams
+        parsed = urlparse(self.path)
+        service = parsed.path.strip('/').split('/', 1)[0]
+        if service == 'upload.php':
+            service = 'upload'
+        if service not in upstreams.knobs:
+            return self._send(404, {'error': 'unknown service'})
+
+        body = self._body()
+        upstreams.calls[service] += 1
+        if upstreams.knobs[service].apply(upstreams.rng):
+            upstreams.failures[service] += 1
+            return self._send(500, {'error': f'{service} indisponible (échec simulé)'})
+        handler = getattr(self, f'_handle_{service}')
+        return handler(parsed, parse_qs(parsed.query), body)
+
+    do_GET = do_POST = do_DELETE = _dispatch
+
+    def _handle_places(self, parsed, query, body):
+        rng = self.server.upstreams.rng
+        if parsed.path.endswith('/photo'):
+            return self._send(200, self.server.upstreams.photo, 'image/jpeg')
+        if parsed.path.endswith('/textsearch/json'):
+            return self._send(200, {'status': 'OK', 'results': [{'place_id': 'fake-place', 'photos': _photo_references(rng, 1)}]})
+        if parsed.path.endswith('/autocomplete/json'):
+            # Comme Places : au plus 5 hôtels dont le nom contient la saisie
+            needle = unidecode(query.get('input', [''])[0]).lower()
+            matches = [name for name in AUTOCOMPLETE_HOTELS if needle in unidecode(name).lower()][:5]
+            return self._send(200, {'status': 'OK' if matches else 'ZERO_RESULTS', 'predictions': [
+                {'description': name, 'place_id': f'fake-{AUTOCOMPLETE_HOTELS.index(name)}'} for name in matches
+            ]})
+        return self._send(200, {'status': 'OK', 'result': {
+            'name': 'Hôtel simulé',
+            'address_components': [{'long_name': 'Marrakech', 'types': ['locality']},
+                                   {'long_name': 'Maroc', 'types': ['country']}],
+            'photos': _photo_references(rng, 10),
+            'rating': 4.6,
+            'user_ratings_total': 2480,
+            'reviews': [
+                {'rating': 5, 'author_name': f'Voyageur {i}', 'text': 'Séjour parfait, personnel adorable. ' * 8,
+                 'relative_time_description': 'il y a 2 mois', 'time': 1700000000 + i}
+                for i in range(5)
+            ],
+        }})
+
+    def _handle_youtube(self, parsed, query, body):
+        if '/thumb/' in parsed.path:
+            return self._send(200, self.server.upstreams.photo, 'image/jpeg')
+        base_url = self.server.upstreams.base_url
+        return self._send(200, {'items': [
+            {'id': {'videoId': f'vid{i:08d}'}, 'snippet': {
+                'title': f'Visite de l\'hôtel {i}',
+                'thumbnails': {'high': {'url': f'{base_url}/youtube/thumb/vid{i:08d}.jpg'}},
+            }} for i in range(4)
+        ]})
+
+    def _handle_gemini(self, parsed, query, body):
+        prompt = json.dumps(json.loads(body or b'{}'), ensure_ascii=False)
+        if 'JSON' in prompt:
+            text = json.dumps({
+                'attractions': [{'name': f'Lieu {i}', 'type': t} for i, t in enumerate(['plage', 'culture', 'gastronomie', 'activite'] * 2)],
+                'restaurants': [{'name': f'Restaurant {i}'} for i in range(3)],
+            })
+        else:
+            text = "Le paradis vous attend à prix d'ami ! 🌴"
+        return self._send(200, {'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 'STOP', 'index': 0,
+        }]})
+
+    def _handle_upload(self, parsed, query, body):
+        # Tient la liste des fichiers reçus, comme le site : sert de référence pour la réconciliation
+        files = self.server.upstreams.files
+        if self.command == 'GET':
+            if query.get('action') != ['list']:
+                return self._send(200, {'success': True, 'message': 'OK'})
+            directory = query.get('directory', [''])[0]
+            return self._send(200, {'success': True, 'files': [
+                {'filename': name, 'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()}
+                for (folder, name), content in sorted(files.items()) if folder == directory
+            ]})
+        payload = json.loads(body) if body else {}
+        key = (payload.get('directory', ''), payload.get('filename', ''))
+        if self.command == 'DELETE':
+            if files.pop(key, None) is None:
+                return self._send(404, {'success': False, 'message': 'Fichier introuvable'})
+            return self._send(200, {'success': True, 'message': 'Supprimé'})
+        files[key] = base64.b64decode(payload.get('content', ''))
+        return self._send(200, {'success': True, 'message': 'OK', 'url': f"https://bench.invalid/{key[0]}/{key[1]}"})
+
+    def _handle_stripe(self, parsed, query, body):
+        resource = parsed.path.rstrip('/').rsplit('/', 1)[-1]
+        object_id = uuid.uuid4().hex[:14]
+        if resource == 'products':
+            return self._send(200, {'id': f'prod_{object_id}', 'object': 'product'})
+        if resource == 'prices':
+            return self._send(200, {'id': f'price_{object_id}', 'object': 'price'})
+        if resource == 'sessions':
+            return self._send(200, {'id': f'cs_{object_id}', 'object': 'checkout.session', 'url': f'https://checkout.bench.invalid/{object_id}'})
+        return self._send(200, {'id': f'obj_{object_id}', 'object': resource})
+
+    def _handle_n8n(self, parsed, query, body):
+        return self._send(200, {'ok': True})
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Serveur SMTP minimal : accepte tous les messages et les oublie."""
+
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        upstreams = self.server.upstreams
+        self._reply('220 bench.invalid ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self._reply('250-bench.invalid')
+                self._reply('250 SIZE 52428800')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self._reply('250 OK')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                upstreams.calls['smtp'] += 1
+                if upstreams.knobs['smtp'].apply(upstreams.rng):
+                    upstreams.failures['smtp'] += 1
+                    self._reply('451 Échec simulé')
+                else:
+                    self._reply('250 OK queued')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeUpstreams:
+    """Démarre les serveurs locaux et fournit la configuration à donner à l'application."""
+
+    def __init__(self, knobs=None, seed=2025):
+        self.knobs = {name: Knob(latency=DEFAULT_LATENCIES[name]) for name in SERVICES}
+        self.knobs.update(knobs or {})
+        self.rng = random.Random(seed)
+        self.calls = {name: 0 for name in SERVICES}
+        self.failures = {name: 0 for name in SERVICES}
+        self.photo = _make_photo()
+        self.files = {}
+        self._servers = []
+
+    def start(self):
+        self.http = ThreadingHTTPServer(('127.0.0.1', 0), _HTTPHandler)
+        self.http.daemon_threads = True
+        self.smtp = _ThreadingSMTPServer(('127.0.0.1', 0), _SMTPHandler)
+        for server in (self.http, self.smtp):
+            server.upstreams = self
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.http.server_address[1]}'
+
+    def environ(self):
+        """Variables d'environnement lues par config.py et services.py."""
+        return {
+            'GOOGLE_API_KEY': 'bench-key',
+            'PLACES_API_BASE': f'{self.base_url}/places',
+            'YOUTUBE_API_BASE': f'{self.base_url}/youtube',
+            'GEMINI_API_ENDPOINT': f'{self.base_url}/gemini',
+            'UPLOAD_API_URL': f'{self.base_url}/upload.php',
+            'STRIPE_API_KEY': 'sk_test_bench',
+            'STRIPE_API_BASE': f'{self.base_url}/stripe',
+            'N8N_WHATSAPP_WEBHOOK': f'{self.base_url}/n8n/webhook',
+            'SITE_PUBLIC_URL': 'https://bench.invalid',
+            'MAIL_SERVER': '127.0.0.1',
+            'MAIL_PORT': str(self.smtp.server_address[1]),
+            'MAIL_USERNAME': 'bench@bench.invalid',
+        }
+
+    def reset_counters(self):
+        self.calls = {name: 0 for name in SERVICES}
+        self.failures = {name: 0 for name in SERVICES}
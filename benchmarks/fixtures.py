@@ -0,0 +1,126 @@
+"""
+Jeux de données réalistes pour les benchmarks
+Génère des voyages comparables à ceux de la production (photos Places, avis, vidéos, Gemini)
+"""
+import random
+import string
+from datetime import date, timedelta
+
+from unidecode import unidecode
+
+DESTINATIONS = [
+    'Marrakech, Maroc', 'Hurghada, Égypte', 'Palma, Espagne', 'Héraklion, Grèce',
+    'Antalya, Turquie', 'Djerba, Tunisie', 'Funchal, Portugal', 'Lanzarote, Espagne',
+]
+HOTEL_PREFIXES = ['Riu', 'Iberostar', 'Barceló', 'Sol', 'Hilton', 'Mövenpick', 'Radisson', 'Club Med']
+HOTEL_SUFFIXES = ['Palace', 'Beach Resort', 'Garden', 'Bay', 'Royal', 'Premium', 'Oasis', 'Marina']
+FIRST_NAMES = ['Élodie', 'Jérôme', 'Amélie', 'François', 'Chloé', 'Sébastien', 'Inès', 'Loïc']
+LAST_NAMES = ['Dubois', 'Lefèvre', 'Mertens', 'Peeters', 'Janssens', 'Lambert', 'Dupont', 'Renard']
+# Base des URLs de photos (remplacée par le serveur Places local pour les tests de charge)
+PLACES_API_BASE = 'https://maps.googleapis.com/maps/api/place'
+LOREM = (
+    "Séjour parfait, personnel aux petits soins et chambre très propre avec une vue magnifique "
+    "sur la mer. Le buffet était varié et les animations en soirée très réussies. "
+)
+
+
+def _photo_reference(rng):
+    return ''.join(rng.choices(string.ascii_letters + string.digits + '-_', k=180))
+
+
+def make_api_data(rng, hotel_name, destination, num_photos=None, places_api_base=PLACES_API_BASE):
+    num_photos = num_photos if num_photos is not None else rng.randint(6, 20)
+    photos = [
+        f"{places_api_base}/photo?maxwidth=800&photoreference={_photo_reference(rng)}&key=FAKE-KEY"
+        for _ in range(num_photos)
+    ]
+    reviews = [
+        {
+            'rating': '⭐' * rng.randint(4, 5),
+            'author': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[0]}.",
+            'text': (LOREM * 3)[:400] + '...',
+            'date': f"il y a {rng.randint(1, 11)} mois",
+        }
+        for _ in range(rng.randint(2, 5))
+    ]
+    city = destination.split(',')[0]
+    return {
+        'photos': photos,
+        'reviews': reviews,
+        'hotel_rating': round(rng.uniform(3.8, 4.9), 1),
+        'total_reviews': rng.randint(200, 9000),
+        'videos': [{'id': ''.join(rng.choices(string.ascii_letters, k=11)), 'title': f"{hotel_name} - visite complète"} for _ in range(4)],
+        'attractions': {
+            'plages': [f"Plage de {city} {i}" for i in range(2)],
+            'culture': [f"Médina de {city}", f"Musée de {city}"],
+            'gastronomie': [f"Marché central de {city}"],
+            'activites': [f"Excursion en quad {city}", f"Plongée à {city}", f"Spa {city}"],
+        },
+        'restaurants': [{'name': f"Restaurant {city} {i}"} for i in range(3)],
+        'cultural_attraction_image': f"{places_api_base}/photo?maxwidth=800&photoreference={_photo_reference(rng)}&key=FAKE-KEY",
+    }
+
+
+def make_trip_payload(rng=None, index=0, places_api_base=PLACES_API_BASE):
+    """Retourne un payload identique à celui envoyé par generation.html à /api/trips."""
+    rng = rng or random.Random(index)
+    destination = rng.choice(DESTINATIONS)
+    hotel = f"{rng.choice(HOTEL_PREFIXES)} {rng.choice(HOTEL_SUFFIXES)}"
+    hotel_name = f"{hotel}, {destination}"
+    start = date(2026, 4, 1) + timedelta(days=rng.randint(0, 200))
+    end = start + timedelta(days=rng.choice([4, 7, 10, 14]))
+    b2b = rng.randint(600, 2500)
+    b2c = b2b + rng.randint(150, 900)
+    flight = rng.choice([0, rng.randint(150, 600)])
+    transfer = rng.choice([0, 40, 60])
+    surcharge = rng.choice([0, 120, 250])
+    car = rng.choice([0, 0, 180])
+    pack = b2b + flight + transfer + surcharge + car + rng.randint(100, 400)
+
+    form_data = {
+        'hotel_name': hotel_name,
+        'destination': destination,
+        'date_start': start.isoformat(),
+        'date_end': end.isoformat(),
+        'stars': str(rng.choice([3, 4, 5])),
+        'num_people': str(rng.choice([1, 2, 2, 4])),
+        'departure_city': 'Bruxelles-Charleroi, Belgique',
+        'arrival_airport': destination,
+        'baggage_type': rng.choice(['Pas de bagages', 'bagages 10 kilos', 'bagages 10 kilos + 1x 20 kilos']),
+        'flight_price': str(flight),
+        'transfer_cost': str(transfer),
+        'car_rental_cost': str(car),
+        'hotel_b2b_price': str(b2b),
+        'hotel_b2c_price': str(b2c),
+        'pack_price': str(pack),
+        'surcharge_cost': str(surcharge),
+        'surcharge_type': rng.choice(['Logement seul', 'Petit déjeuner', 'Demi pension', 'Pension complète', 'All-In']),
+        'exclusive_services': "Accès au lounge VIP de l'aéroport\nUne bouteille de champagne en chambre",
+        'instagram_handle': '',
+        'is_ultra_budget': rng.random() < 0.15,
+    }
+    comparison_total = b2c + flight + transfer + surcharge + car
+    return {
+        'success': True,
+        'form_data': form_data,
+        'api_data': make_api_data(rng, hotel, destination, places_api_base=places_api_base),
+        'margin': pack - (b2b + flight + transfer + surcharge + car),
+        'savings': comparison_total - pack,
+        'comparison_total': comparison_total,
+    }
+
+
+def make_client(rng):
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    return {
+        'client_first_name': first_name,
+        'client_last_name': last_name,
+        'client_email': f"{unidecode(first_name).lower()}.{unidecode(last_name).lower()}@example.com",
+        'client_phone': f"+32 4{rng.randint(70, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}",
+    }
+
+
+def make_trip_payloads(count, seed=2025, places_api_base=PLACES_API_BASE):
+    rng = random.Random(seed)
+    return [make_trip_payload(rng, i, places_api_base=places_api_base) for i in range(count)]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Test de charge : débit de saturation de l'application selon la configuration gunicorn
+À exécuter depuis la racine du projet : python -m benchmarks.load_test --configs 1x1,2x1,2x4
+
+Pour chaque configuration (workers x threads), l'application est lancée avec gunicorn sur une
+base pré-remplie de plusieurs milliers de voyages, puis soumise à un mélange de trafic réaliste
+(galerie publique, listes du tableau de bord, quelques publications et assignations) à des niveaux
+de concurrence croissants. Le débit de saturation est le meilleur débit obtenu tant que le p99
+reste sous --p99-slo-ms et que les erreurs restent sous 1 %.
+
+Les services externes sont simulés (benchmarks/fake_upstreams.py). Avec SQLite, les écritures
+concurrentes de plusieurs workers se bloquent : passer --database-url postgresql://... pour
+dimensionner la production.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from benchmarks.bench_flows import percentile, RESULTS_DIR, _git_revision
+from benchmarks.fake_upstreams import FakeUpstreams
+from benchmarks.fixtures import make_trip_payloads, make_client
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERNAME, PASSWORD = 'charge', 'charge-bench'
+DEFAULT_MIX = 'published=70,dashboard=25,publish=3,assign=2'
+ERROR_RATE_LIMIT = 0.01
+
+
+def seed_database(database_url, count, places_api_base, seed=2025):
+    """Remplit la base avec `count` voyages répartis entre proposés, publiés, assignés et vendus."""
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from models import db, Trip
+    from pricing import compute_pricing
+
+    app = create_app()
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        for i, payload in enumerate(make_trip_payloads(count, seed=seed, places_api_base=places_api_base)):
+            form_data = payload['form_data']
+            trip = Trip(
+                full_data=payload,
+                hotel_name=form_data['hotel_name'],
+                destination=form_data['destination'],
+                price=int(form_data['pack_price']),
+                margin=compute_pricing(form_data)['margin'],
+                is_ultra_budget=form_data['is_ultra_budget'],
+                created_at=now - timedelta(days=rng.randint(0, 365)),
+            )
+            roll = rng.random()
+            if roll < 0.6:
+                trip.status = 'proposed'
+                if rng.random() < 0.4:
+                    trip.is_published = True
+                    trip.published_filename = f'offre_{i}.html'
+            else:
+                trip.status = 'assigned' if roll < 0.9 else 'sold'
+                for key, value in make_client(rng).items():
+                    setattr(trip, key, value)
+                trip.assigned_at = trip.created_at + timedelta(days=1)
+                if trip.status == 'sold':
+                    trip.sold_at = trip.assigned_at + timedelta(days=2)
+            db.session.add(trip)
+            if i % 500 == 499:
+                db.session.commit()
+        db.session.commit()
+        proposed_ids = [row.id for row in db.session.query(Trip.id).filter_by(status='proposed')]
+        db.session.remove()
+        db.engine.dispose()
+    return proposed_ids
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class GunicornServer:
+    def __init__(self, workers, threads, env):
+        self.workers = workers
+        self.threads = threads
+        self.port = _free_port()
+        self.env = {**env, 'WEB_CONCURRENCY': str(workers), 'GUNICORN_THREADS': str(threads)}
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{self.port}', '--timeout', '120'],
+            cwd=PROJECT_ROOT, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn s'est arrêté : {self.process.stderr.read().decode()[-2000:]}")
+            try:
+                requests.get(f'{self.base_url}/login', timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.3)
+        raise RuntimeError('gunicorn ne répond pas après 60 secondes')
+
+    def __exit__(self, *exc):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class LoadGenerator:
+    """Clients concurrents rejouant le mélange de requêtes pendant une durée fixe."""
+
+    def __init__(self, base_url, mix, trip_ids, seed=2025):
+        self.base_url = base_url
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.trip_ids = trip_ids
+        self.seed = seed
+
+    def _session(self):
+        session = requests.Session()
+        session.post(f'{self.base_url}/login', data={'username': USERNAME, 'password': PASSWORD}, allow_redirects=False, timeout=10)
+        return session
+
+    def _request(self, session, rng, operation):
+        if operation == 'published':
+            return requests.get(f'{self.base_url}/api/published-trips', timeout=60)
+        if operation == 'dashboard':
+            status = rng.choice(['proposed', 'proposed', 'assigned', 'sold'])
+            return session.get(f'{self.base_url}/api/trips', params={'status': status}, timeout=60)
+        trip_id = rng.choice(self.trip_ids)
+        if operation == 'publish':
+            return session.post(f'{self.base_url}/api/trip/{trip_id}/publish', json={'publish': True}, timeout=120)
+        return session.post(f'{self.base_url}/api/trip/{trip_id}/assign', json=make_client(rng), timeout=120)
+
+    def run(self, concurrency, duration):
+        samples = []
+        lock = threading.Lock()
+        stop_at = time.monotonic() + duration
+
+        def worker(index):
+            rng = random.Random(self.seed + index)
+            session = self._session()
+            local = []
+            while time.monotonic() < stop_at:
+                operation = rng.choices(self.operations, self.weights)[0]
+                start = time.perf_counter()
+                try:
+                    ok = self._request(session, rng, operation).status_code < 400
+                except requests.RequestException:
+                    ok = False
+                local.append((operation, time.perf_counter() - start, ok))
+            with lock:
+                samples.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        durations = sorted(d for _, d, _ in samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        by_operation = {}
+        for operation in self.operations:
+            op_durations = sorted(d for name, d, _ in samples if name == operation)
+            if op_durations:
+                by_operation[operation] = {
+                    'count': len(op_durations),
+                    'p50_ms': round(percentile(op_durations, 50) * 1000, 1),
+                    'p99_ms': round(percentile(op_durations, 99) * 1000, 1),
+                }
+        return {
+            'concurrency': concurrency,
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(durations, 50) * 1000, 1) if durations else None,
+            'p99_ms': round(percentile(durations, 99) * 1000, 1) if durations else None,
+            'error_rate': round(errors / len(samples), 4) if samples else 1.0,
+            'operations': by_operation,
+        }
+
+
+def saturation(levels, p99_slo_ms):
+    """Meilleur palier respectant le SLO de p99 et le taux d'erreur maximal."""
+    healthy = [level for level in levels if level['p99_ms'] is not None
+               and level['p99_ms'] <= p99_slo_ms and level['error_rate'] < ERROR_RATE_LIMIT]
+    return max(healthy, key=lambda level: level['throughput_rps']) if healthy else None
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('published', 'dashboard', 'publish', 'assign'):
+            raise SystemExit(f"Opération inconnue dans --mix : {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--configs', default='1x1,2x1,2x4,4x4', help='configurations gunicorn WORKERSxTHREADS')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help='niveaux de concurrence testés')
+    parser.add_argument('--duration', type=float, default=15, help='durée de chaque palier (secondes)')
+    parser.add_argument('--trips', type=int, default=3000, help='nombre de voyages en base')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='poids des opérations')
+    parser.add_argument('--p99-slo-ms', type=float, default=1000)
+    parser.add_argument('--database-url', help='base à utiliser (par défaut un fichier SQLite temporaire)')
+    parser.add_argument('--no-save', action='store_true', help='ne pas enregistrer les résultats')
+    args = parser.parse_args(argv)
+
+    configs = [tuple(int(n) for n in config.split('x')) for config in args.configs.split(',')]
+    levels = [int(n) for n in args.concurrency.split(',')]
+    mix = _parse_mix(args.mix)
+
+    upstreams = FakeUpstreams().start()
+    workdir = tempfile.mkdtemp(prefix='odyssee-load-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ.update(upstreams.environ())
+    os.environ.update({'LOG_LEVEL': 'WARNING', 'IMAGE_CACHE_DIR': os.path.join(workdir, 'images')})
+
+    print(f"Préparation de {args.trips} voyages dans {database_url}...")
+    trip_ids = seed_database(database_url, args.trips, f'{upstreams.base_url}/places')
+
+    server_env = {
+        **os.environ,
+        'DATABASE_URL': database_url,
+        'USER1_NAME': USERNAME,
+        'USER1_PASS': PASSWORD,
+        'PYTHONUNBUFFERED': '1',
+    }
+
+    report = []
+    for workers, threads in configs:
+        print(f"\n=== gunicorn {workers} worker(s) x {threads} thread(s) ===")
+        print(f"{'clients':>8} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'erreurs':>8}")
+        results = []
+        with GunicornServer(workers, threads, server_env) as server:
+            generator = LoadGenerator(server.base_url, mix, trip_ids)
+            for concurrency in levels:
+                result = generator.run(concurrency, args.duration)
+                results.append(result)
+                print(f"{concurrency:>8} {result['throughput_rps']:>8} {result['p50_ms']:>9} {result['p99_ms']:>9} {result['error_rate']:>8.1%}")
+                if result['p99_ms'] and result['p99_ms'] > args.p99_slo_ms * 3:
+                    break  # Bien au-delà de la saturation : inutile de monter plus haut
+        best = saturation(results, args.p99_slo_ms)
+        report.append({'workers': workers, 'threads': threads, 'levels': results, 'saturation': best})
+
+    upstreams.stop()
+
+    print(f"\nDébit de saturation (p99 <= {args.p99_slo_ms:.0f} ms, erreurs < {ERROR_RATE_LIMIT:.0%})")
+    print(f"{'config':<10} {'req/s':>8} {'clients':>8} {'p99 ms':>9}")
+    for entry in report:
+        best = entry['saturation']
+        config = f"{entry['workers']}x{entry['threads']}"
+        if best:
+            print(f"{config:<10} {best['throughput_rps']:>8} {best['concurrency']:>8} {best['p99_ms']:>9}")
+        else:
+            print(f"{config:<10} {'SLO jamais respecté':>27}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        path = os.path.join(RESULTS_DIR, f'load-{timestamp}.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'timestamp': timestamp,
+                'git_revision': _git_revision(),
+                'trips': args.trips,
+                'mix': mix,
+                'duration': args.duration,
+                'p99_slo_ms': args.p99_slo_ms,
+                'database': database_url.split(':', 1)[0],
+                'configs': report,
+            }, f, indent=2)
+        print(f"\nRésultats enregistrés dans {os.path.relpath(path)}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
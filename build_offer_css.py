@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Génère la feuille de style purgée des pages d'offre (templates/offer_critical.css)
+À exécuter depuis la racine du projet : python build_offer_css.py [--source tailwind.min.css]
+
+Les classes utilisées sont relevées dans le code qui produit les pages (services.py), comme le
+ferait l'option « purge » de Tailwind : seules les règles dont toutes les classes apparaissent
+sont conservées. La feuille est ensuite insérée dans chaque page, sans appel au CDN.
+Étape lancée par le Dockerfile, qui échoue si la feuille ne peut pas être produite ; à relancer
+après toute modification des classes des offres.
+"""
+import argparse
+import os
+import re
+import sys
+
+import requests
+import tinycss2
+
+TAILWIND_URL = 'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css'
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONTENT_FILES = [os.path.join(ROOT, 'services.py')]
+OUTPUT_PATH = os.path.join(ROOT, 'templates', 'offer_critical.css')
+# Classes présentes dans toute page d'offre : leur absence signale une source inutilisable
+REQUIRED_CLASSES = ('mx-auto', 'font-bold', 'bg-blue-500', 'text-white', 'rounded-lg')
+
+# Même découpage que l'extracteur par défaut de Tailwind : tout ce qui ressemble à une classe
+_CANDIDATE_RE = re.compile(r'[^<>"\'`\s{}]*[^<>"\'`\s:{}]')
+# Classe d'un sélecteur, échappements compris (.hover\:bg-blue-600, .w-1\/2)
+_CLASS_RE = re.compile(r'\.((?:\\.|[^\s.:#\[\]>+~,()\\])+)')
+_ESCAPE_RE = re.compile(r'\\(.)')
+
+
+def used_candidates(paths):
+    candidates = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            candidates.update(_CANDIDATE_RE.findall(f.read()))
+    return candidates
+
+
+def _selector_is_used(selector, candidates):
+    classes = [_ESCAPE_RE.sub(r'\1', name) for name in _CLASS_RE.findall(selector)]
+    return all(name in candidates for name in classes)
+
+
+def _purge_rules(rules, candidates):
+    kept = []
+    for rule in rules:
+        if rule.type == 'qualified-rule':
+            selectors = [s.strip() for s in tinycss2.serialize(rule.prelude).split(',')]
+            selectors = [s for s in selectors if _selector_is_used(s, candidates)]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{tinycss2.serialize(rule.content).strip()}}}")
+        elif rule.type == 'at-rule' and rule.lower_at_keyword == 'media' and rule.content is not None:
+            inner = _purge_rules(tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True), candidates)
+            if inner:
+                kept.append(f"@media {tinycss2.serialize(rule.prelude).strip()}{{{''.join(inner)}}}")
+        elif rule.type == 'at-rule' and rule.lower_at_keyword == 'keyframes':
+            # Conservée seulement si une règle gardée l'utilise (animate-spin, animate-pulse...)
+            kept.append(('keyframes', tinycss2.serialize(rule.prelude).strip(), tinycss2.serialize([rule])))
+    return kept
+
+
+def purge(stylesheet, candidates):
+    rules = tinycss2.parse_stylesheet(stylesheet, skip_comments=True, skip_whitespace=True)
+    kept = _purge_rules(rules, candidates)
+    css = ''.join(item for item in kept if isinstance(item, str))
+    keyframes = ''.join(item[2] for item in kept if not isinstance(item, str) and item[1] in css)
+    return css + keyframes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', help=f'feuille Tailwind locale (par défaut : {TAILWIND_URL})')
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.source:
+        with open(args.source, encoding='utf-8') as f:
+            stylesheet = f.read()
+    else:
+        try:
+            response = requests.get(TAILWIND_URL, timeout=60)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Impossible de télécharger {TAILWIND_URL} : {e}", file=sys.stderr)
+            return 1
+        stylesheet = response.text
+
+    css = purge(stylesheet, used_candidates(CONTENT_FILES))
+    missing = [name for name in REQUIRED_CLASSES if f'.{name}' not in css]
+    if missing:
+        # Source inattendue (autre version, page d'erreur) : mieux vaut arrêter le build
+        print(f"❌ Feuille purgée incomplète, classes absentes : {', '.join(missing)}", file=sys.stderr)
+        return 1
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(css)
+    print(f"✅ {os.path.relpath(args.output, ROOT)} : {len(css) / 1024:.1f} Ko (source {len(stylesheet) / 1024:.1f} Ko)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,8 @@
 # config.py
 import os
 
+from database import engine_options
+
 class Config:
     """Configuration de l'application Flask."""
     
@@ -11,9 +13,14 @@ class Config:
     # sinon, utilise la base de données locale (SQLite) pour le développement.
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool de connexions (taille selon GUNICORN_THREADS, pre-ping, recycle, timeout des requêtes)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     
     # Clé API Google
     GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
+    # Autocomplétion des hôtels : durée de vie des prédictions Places en cache (secondes) et taille maximale
+    AUTOCOMPLETE_TTL = int(os.environ.get('AUTOCOMPLETE_TTL') or 3600)
+    AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('AUTOCOMPLETE_MAX_ENTRIES') or 5000)
 
     # Configuration pour l'envoi d'emails
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -32,6 +39,15 @@ class Config:
     # Configuration Stripe
     STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
     STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    # Point d'accès de l'API Stripe (par défaut celui de la bibliothèque stripe)
+    STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE')
+    STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get('STRIPE_MAX_NETWORK_RETRIES') or 2)
+    # Préfixe des clés d'idempotence, propre à chaque déploiement (par défaut : empreinte de la base)
+    STRIPE_IDEMPOTENCY_PREFIX = os.environ.get('STRIPE_IDEMPOTENCY_PREFIX')
+    # Nombre d'événements webhook traités par lot en arrière-plan
+    STRIPE_EVENTS_BATCH_SIZE = int(os.environ.get('STRIPE_EVENTS_BATCH_SIZE') or 50)
+    # Délai (secondes) après lequel un événement resté 'processing' est considéré abandonné et repris
+    STRIPE_EVENTS_CLAIM_TIMEOUT = int(os.environ.get('STRIPE_EVENTS_CLAIM_TIMEOUT') or 600)
 
     # Configuration SFTP pour la publication
     FTP_HOSTNAME = os.environ.get('FTP_HOSTNAME')
@@ -39,6 +55,33 @@ class Config:
     FTP_PASSWORD = os.environ.get('FTP_PASSWORD')
     FTP_REMOTE_PATH = os.environ.get('FTP_REMOTE_PATH')
     
+    # API de publication sur le site (upload.php)
+    UPLOAD_API_URL = os.environ.get('UPLOAD_API_URL')
+    UPLOAD_API_KEY = os.environ.get('UPLOAD_API_KEY')
+    
+    # Pipeline d'images des offres : 'upload' (dossier /images/ du site) ou 'local' (servies par l'app)
+    IMAGE_STORAGE = os.environ.get('IMAGE_STORAGE') or 'upload'
+    IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR')
+    # Photos traitées en parallèle (téléchargement, déclinaisons et envois) pendant une publication
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS') or 6)
+    
+    # Durée de cache (secondes) des statistiques du tableau de bord
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL') or 60)
+    
+    # Jeton Bearer accepté par /metrics (collecteur Prometheus sans session)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Profilage des requêtes lentes (un en-tête X-Profile: 1 force le profilage pour un utilisateur connecté)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILE_THRESHOLD_MS = int(os.environ.get('PROFILE_THRESHOLD_MS') or 2000)
+    # La durée n'est connue qu'à la fin : le profileur démarre sur cette part des requêtes, et seules
+    # celles qui dépassent le seuil sont gardées. Sous 1.0, des requêtes lentes échappent au profilage.
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 1.0)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES') or 200)
+    
     # URLs
     SITE_PUBLIC_URL = os.environ.get('SITE_PUBLIC_URL')
+    # Délai de regroupement des changements avant l'envoi de offres/index.json (secondes)
+    FEED_DEBOUNCE_SECONDS = float(os.environ.get('FEED_DEBOUNCE_SECONDS') or 5)
     N8N_WHATSAPP_WEBHOOK = os.environ.get('N8N_WHATSAPP_WEBHOOK')
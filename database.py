@@ -0,0 +1,97 @@
+# database.py - Réglages du pool de connexions SQLAlchemy et suivi de son état
+import os
+import threading
+import time
+
+from sqlalchemy import event, text
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def worker_threads(environ=os.environ):
+    """Nombre de threads par worker gunicorn (1 avec les workers synchrones par défaut)."""
+    return max(1, _env_int(environ, 'GUNICORN_THREADS', 1))
+
+
+def engine_options(database_uri, environ=os.environ):
+    """Options de create_engine adaptées au modèle de workers.
+
+    Chaque worker gunicorn a son propre pool : une connexion par thread suffit, avec une petite
+    marge de débordement. pool_pre_ping et pool_recycle évitent les connexions coupées par le
+    proxy de Railway après une longue inactivité.
+    """
+    options = {'pool_pre_ping': True}
+    if database_uri.startswith('sqlite'):
+        # SQLite : Flask-SQLAlchemy choisit lui-même le pool adapté (mémoire ou fichier)
+        return options
+
+    options.update({
+        'pool_size': _env_int(environ, 'DB_POOL_SIZE', worker_threads(environ)),
+        'max_overflow': _env_int(environ, 'DB_MAX_OVERFLOW', 2),
+        'pool_timeout': _env_int(environ, 'DB_POOL_TIMEOUT', 10),
+        'pool_recycle': _env_int(environ, 'DB_POOL_RECYCLE', 300),
+    })
+    if database_uri.startswith('postgres'):
+        statement_timeout = _env_int(environ, 'DB_STATEMENT_TIMEOUT_MS', 15000)
+        options['connect_args'] = {
+            'connect_timeout': _env_int(environ, 'DB_CONNECT_TIMEOUT', 10),
+            'options': f'-c statement_timeout={statement_timeout}',
+        }
+    return options
+
+
+class PoolMonitor:
+    """Compte les événements du pool d'un engine (connexions ouvertes, emprunts, invalidations)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.counters = {'connects': 0, 'checkouts': 0, 'invalidations': 0}
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _increment(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self._increment('connects')
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._increment('checkouts')
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self._increment('invalidations')
+
+    def status(self):
+        """État courant du pool et compteurs cumulés depuis le démarrage du worker."""
+        pool = self.engine.pool
+        stats = {'pool_class': type(pool).__name__}
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        with self._lock:
+            stats.update(self.counters)
+        return stats
+
+    def gauges(self):
+        """Jauges au format attendu par metrics.register_gauges."""
+        gauges = []
+        for name, value in self.status().items():
+            if name in self.counters:
+                gauges.append((f'odyssee_db_pool_{name}_total', 'counter', f'Pool SQLAlchemy : {name} cumulés.', {}, value))
+            elif name != 'pool_class':
+                gauges.append((f'odyssee_db_pool_{name}', 'gauge', f'Pool SQLAlchemy : {name}.', {}, value))
+        return gauges
+
+    def ping(self):
+        """Exécute SELECT 1 et retourne la latence en millisecondes."""
+        start = time.perf_counter()
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        return round((time.perf_counter() - start) * 1000, 2)
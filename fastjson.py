@@ -0,0 +1,53 @@
+# fastjson.py - Couche JSON rapide : orjson si installé, sinon le module json standard
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson est optionnel
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def dumps(obj):
+    """Sérialise en texte JSON compact."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def loads(data):
+    """Désérialise du texte ou des octets JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Fournisseur JSON de Flask basé sur orjson (jsonify, request.get_json...).
+
+    Retombe sur le comportement standard de Flask si orjson est absent ou si des options
+    propres au module json sont demandées (indentation en mode debug par exemple).
+    """
+
+    def _orjson_options(self):
+        return ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
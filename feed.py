@@ -0,0 +1,133 @@
+# feed.py - Flux statique des offres publiques (offres/index.json), republié quand la sélection change
+import logging
+import threading
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload
+
+import fastjson
+from images import preferred_image_url
+from models import db, Trip, TripOffer
+
+logger = logging.getLogger(__name__)
+
+FEED_FILENAME = 'index.json'
+FEED_DIRECTORY = 'offres'
+# Colonnes d'un voyage qui apparaissent dans le flux (offer_id couvre photos, dates et économies)
+FEED_FIELDS = ('is_published', 'published_filename', 'price', 'hotel_name', 'destination', 'is_ultra_budget', 'offer_id')
+
+
+def _duration_days(trip):
+    if not (trip.offer and trip.offer.date_start and trip.offer.date_end):
+        return 0
+    try:
+        return (datetime.strptime(trip.offer.date_end, '%Y-%m-%d') - datetime.strptime(trip.offer.date_start, '%Y-%m-%d')).days
+    except (ValueError, TypeError):
+        return 0
+
+
+def build_published_feed(site_public_url):
+    """Liste des offres publiques telle que l'attend la galerie du site."""
+    # Le flux lit le payload de chaque offre : chargé dans la même requête (sinon une requête par offre)
+    trips = (Trip.query.filter_by(is_published=True)
+             .options(joinedload(Trip.offer).undefer(TripOffer.payload))
+             .order_by(Trip.created_at.desc()).all())
+    feed = []
+    for trip in trips:
+        api_data = trip.api_data
+        feed.append({
+            'hotel_name': trip.hotel_name.split(',')[0].strip(),
+            'destination': trip.destination,
+            'price': trip.price,
+            'image_url': preferred_image_url(api_data, api_data.get('photos', [None])[0]),
+            'offer_url': f"{site_public_url}/offres/{trip.published_filename}",
+            'savings': trip.savings,
+            'num_people': trip.form_data.get('num_people', 2),
+            'is_ultra_budget': trip.is_ultra_budget,
+            'duration': _duration_days(trip),
+        })
+    return feed
+
+
+class FeedPublisher:
+    """Regroupe les changements rapprochés en un seul envoi de offres/index.json."""
+
+    def __init__(self, app, publication_service, delay=5.0):
+        self.app = app
+        self.publication_service = publication_service
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def schedule(self):
+        # Chaque changement repousse l'envoi : une rafale de publications ne produit qu'un upload
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.publish)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def publish(self):
+        """Régénère le flux et l'envoie s'il a changé. Retourne True si le site est à jour."""
+        with self._lock:
+            self._timer = None
+        with self.app.app_context():
+            try:
+                feed = build_published_feed(self.app.config['SITE_PUBLIC_URL'])
+            except Exception as e:
+                logger.exception("❌ Impossible de générer le flux des offres: %s", e)
+                return False
+
+            # Un flux identique à celui en ligne n'est pas renvoyé (manifeste des fichiers publiés)
+            body = fastjson.dumps(feed).encode('utf-8')
+            try:
+                if not self.publication_service.upload_file(FEED_FILENAME, body, FEED_DIRECTORY):
+                    logger.error("❌ Flux des offres non publié (%d offres), nouvel essai au prochain changement", len(feed))
+                    return False
+                db.session.commit()
+            except Exception as e:
+                # Fichier peut-être envoyé mais non consigné : le prochain envoi le réécrira
+                db.session.rollback()
+                logger.exception("❌ Impossible d'enregistrer la publication du flux des offres: %s", e)
+                return False
+        logger.info("📰 Flux des offres à jour: %d offres", len(feed))
+        return True
+
+
+def init_feed_publisher(app, publication_service):
+    publisher = FeedPublisher(app, publication_service, delay=app.config.get('FEED_DEBOUNCE_SECONDS', 5.0))
+    app.extensions['feed_publisher'] = publisher
+    return publisher
+
+
+def _affects_feed(trip, state):
+    if state == 'new' or state == 'deleted':
+        return bool(trip.is_published)
+    attrs = inspect(trip).attrs
+    changed = any(attrs[name].history.has_changes() for name in FEED_FIELDS)
+    return changed and (trip.is_published or attrs['is_published'].history.has_changes())
+
+
+@event.listens_for(Session, 'after_flush')
+def _detect_feed_changes(session, flush_context):
+    for state, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        if any(isinstance(obj, Trip) and _affects_feed(obj, state) for obj in objects):
+            session.info['feed_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _schedule_feed_publication(session):
+    if not session.info.pop('feed_changed', False) or not has_app_context():
+        return
+    publisher = current_app.extensions.get('feed_publisher')
+    if publisher is not None:
+        publisher.schedule()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_feed_changes(session):
+    session.info.pop('feed_changed', None)
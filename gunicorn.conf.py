@@ -0,0 +1,6 @@
+# gunicorn.conf.py - Chargé automatiquement par gunicorn (Procfile / railway.json)
+import os
+
+# WEB_CONCURRENCY est aussi lu nativement par gunicorn ; GUNICORN_THREADS fixe la taille du pool SQLAlchemy
+workers = int(os.environ.get('WEB_CONCURRENCY') or 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 1)
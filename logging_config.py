@@ -0,0 +1,132 @@
+# logging_config.py - Journaux structurés (JSON par ligne), identifiant de requête et échantillonnage
+import atexit
+import contextvars
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import traceback
+import uuid
+from datetime import datetime, timezone
+
+import fastjson
+
+# Identifiant de la requête HTTP en cours, propagé aux threads via contextvars.copy_context()
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# Attributs standards d'un LogRecord : tout le reste vient de extra={...} et part dans le JSON
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'sample_rate'}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Ajoute l'identifiant de requête courant à chaque enregistrement."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Ne garde qu'une fraction des lignes fréquentes : logger.info(..., extra={'sample_rate': 0.1}).
+
+    Les avertissements et erreurs ne sont jamais échantillonnés.
+    """
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # On fige seulement le message et l'exception ; le formatage se fait dans le thread d'écriture
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return fastjson.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    """Format lisible pour le développement local (LOG_FORMAT=text)."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s')
+
+
+def configure_logging(level=None, log_format=None):
+    """Configure le logger racine une seule fois par processus.
+
+    L'écriture sur stdout se fait dans un thread dédié (QueueHandler/QueueListener) :
+    une ligne de journal ne bloque jamais le thread qui traite la requête.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    log_format = (log_format or os.environ.get('LOG_FORMAT') or 'json').lower()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TextFormatter() if log_format == 'text' else JSONFormatter())
+
+    # Les filtres s'exécutent dans le thread appelant, où le contexte de la requête est disponible
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+    # Bibliothèques bavardes : on ne garde que leurs avertissements
+    for name in ('urllib3', 'PIL', 'weasyprint', 'fontTools'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def init_request_logging(app):
+    """Attribue un identifiant à chaque requête (en-tête X-Request-ID repris s'il est fourni)."""
+    from flask import request
+
+    @app.before_request
+    def _assign_request_id():
+        # Pas de remise à zéro au teardown : les réponses en flux (stream_with_context) sont
+        # générées après celui-ci. Chaque requête écrase simplement la valeur précédente du thread.
+        request_id_var.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+
+    @app.after_request
+    def _expose_request_id(response):
+        request_id = request_id_var.get()
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
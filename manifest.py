@@ -0,0 +1,51 @@
+# manifest.py - Manifeste local des fichiers téléversés sur le site (empreinte, taille, date)
+import hashlib
+import logging
+from datetime import datetime
+
+from flask import has_app_context
+
+from models import db, PublishedFile
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(content_bytes):
+    return hashlib.sha256(content_bytes).hexdigest()
+
+
+class PublicationManifest:
+    """Ce que l'application a téléversé, pour ne pas renvoyer un fichier identique.
+
+    Les entrées sont ajoutées à la session en cours : elles sont enregistrées avec le reste de
+    la requête (un rollback les annule, le fichier sera simplement renvoyé la fois suivante).
+    Hors contexte d'application (threads sans app_context), le manifeste est ignoré.
+    """
+
+    def _entry(self, directory, filename):
+        return PublishedFile.query.filter_by(directory=directory, filename=filename).first()
+
+    def is_current(self, directory, filename, digest):
+        if not has_app_context():
+            return False
+        entry = self._entry(directory, filename)
+        return entry is not None and entry.digest == digest
+
+    def record(self, directory, filename, digest, size):
+        if not has_app_context():
+            return
+        entry = self._entry(directory, filename)
+        if entry is None:
+            entry = PublishedFile(directory=directory, filename=filename)
+            db.session.add(entry)
+        entry.digest = digest
+        entry.size = size
+        entry.uploaded_at = datetime.utcnow()
+
+    def forget(self, directory, filename):
+        if not has_app_context():
+            return
+        PublishedFile.query.filter_by(directory=directory, filename=filename).delete()
+
+    def entries(self, directory):
+        return {entry.filename: entry for entry in PublishedFile.query.filter_by(directory=directory)}
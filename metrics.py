@@ -0,0 +1,217 @@
+# metrics.py - Mesures de performance (routes, appels externes, base de données, caches)
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Bornes des histogrammes en secondes : de la requête SQL (ms) à l'appel Gemini (dizaines de s)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = _format_labels(self.labels, label_values, f'le="{_format_number(float(bound))}"')
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {_format_number(round(total, 6))}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    'odyssee_http_request_duration_seconds', 'Durée des requêtes HTTP par route.',
+    labels=('endpoint', 'method', 'status'))
+REQUEST_DB_QUERIES = Histogram(
+    'odyssee_http_request_db_queries', 'Nombre de requêtes SQL exécutées par requête HTTP.',
+    labels=('endpoint',), buckets=COUNT_BUCKETS)
+UPSTREAM_LATENCY = Histogram(
+    'odyssee_upstream_duration_seconds', 'Durée des appels aux services externes.',
+    labels=('upstream', 'outcome'))
+DB_QUERY_LATENCY = Histogram(
+    'odyssee_db_query_duration_seconds', 'Durée des requêtes SQL par type d\'instruction.',
+    labels=('statement',))
+CACHE_REQUESTS = Counter(
+    'odyssee_cache_requests_total', 'Consultations des caches applicatifs.',
+    labels=('cache', 'result'))
+
+STRIPE_EVENTS = Counter(
+    'odyssee_stripe_events_total', 'Événements Stripe reçus et traités, par type et résultat.',
+    labels=('type', 'status'))
+
+REGISTRY = [REQUEST_LATENCY, REQUEST_DB_QUERIES, UPSTREAM_LATENCY, DB_QUERY_LATENCY, CACHE_REQUESTS, STRIPE_EVENTS]
+
+# Fonctions retournant des valeurs calculées au moment de l'export : [(nom, type, aide, {labels}, valeur)]
+_gauge_collectors = {}
+
+
+class UpstreamCall:
+    """Issue d'un appel externe ; `record(response)` classe une réponse HTTP 4xx/5xx en erreur."""
+    __slots__ = ('outcome',)
+
+    def __init__(self):
+        self.outcome = 'ok'
+
+    def record(self, response):
+        status = getattr(response, 'status_code', None)
+        if isinstance(status, int) and status >= 400:
+            self.outcome = 'error'
+        return response
+
+
+@contextmanager
+def upstream(name):
+    """Mesure un appel externe (places, youtube, gemini, upload, stripe, smtp, n8n).
+
+    Une exception compte comme une erreur ; les appels HTTP passent leur réponse à `call.record`
+    pour que les statuts 4xx/5xx, qui ne lèvent rien, soient aussi comptés :
+
+        with metrics.upstream('places') as call:
+            response = call.record(requests.get(url, timeout=15))
+    """
+    start = time.perf_counter()
+    call = UpstreamCall()
+    try:
+        yield call
+    except Exception:
+        call.outcome = 'error'
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, name, call.outcome)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def record_stripe_event(event_type, status):
+    STRIPE_EVENTS.inc(event_type, status)
+
+
+def register_gauges(name, collector):
+    _gauge_collectors[name] = collector
+
+
+def render():
+    """Export au format texte de Prometheus (valeurs propres à ce processus worker)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for collector in list(_gauge_collectors.values()):
+        for name, kind, help_text, labels, value in collector():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {_format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _statement_type(statement):
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+
+
+def instrument_engine(engine):
+    """Chronomètre chaque requête SQL et les compte pour la requête HTTP en cours."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        DB_QUERY_LATENCY.observe(time.perf_counter() - starts.pop(), _statement_type(statement))
+        if has_request_context():
+            g.metrics_db_queries = g.get('metrics_db_queries', 0) + 1
+
+
+def instrument_app(app):
+    """Enregistre la durée et le nombre de requêtes SQL de chaque requête HTTP."""
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_db_queries = 0
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        labels = (request.endpoint or 'unmatched', request.method, response.status_code)
+
+        def record():
+            REQUEST_LATENCY.observe(time.perf_counter() - start, *labels)
+
+        if response.is_streamed:
+            # Réponses en flux (aperçu NDJSON) : la durée court jusqu'à la fin de l'envoi
+            response.call_on_close(record)
+        else:
+            record()
+        REQUEST_DB_QUERIES.observe(g.get('metrics_db_queries', 0), labels[0])
+        return response
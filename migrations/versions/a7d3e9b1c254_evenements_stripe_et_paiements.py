@@ -0,0 +1,48 @@
+"""Événements Stripe dédupliqués et paiements reçus sur les voyages
+
+Revision ID: a7d3e9b1c254
+Revises: f1c4e8a2b735
+Create Date: 2026-10-19 16:05:12.447190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9b1c254'
+down_revision = 'f1c4e8a2b735'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stripe_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stripe_event_id', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stripe_event_id')
+    )
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stripe_event_status'), ['status'], unique=False)
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('amount_paid', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('paid_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.drop_column('paid_at')
+        batch_op.drop_column('amount_paid')
+
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stripe_event_status'))
+
+    op.drop_table('stripe_event')
@@ -0,0 +1,48 @@
+"""Ajout de la marge et des index de statistiques sur Trip
+
+Revision ID: b41e7c9d2f10
+Revises: aa220b5ebf49
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e7c9d2f10'
+down_revision = 'aa220b5ebf49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('margin', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_trip_margin'), ['margin'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trip_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trip_destination'), ['destination'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trip_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trip_sold_at'), ['sold_at'], unique=False)
+
+    # Recopie la marge déjà calculée dans full_data_json
+    connection = op.get_bind()
+    trip_table = sa.table('trip', sa.column('id', sa.Integer), sa.column('full_data_json', sa.Text), sa.column('margin', sa.Integer))
+    for trip_id, full_data_json in connection.execute(sa.select(trip_table.c.id, trip_table.c.full_data_json)):
+        try:
+            margin = int(json.loads(full_data_json).get('margin') or 0)
+        except (ValueError, TypeError):
+            continue
+        connection.execute(trip_table.update().where(trip_table.c.id == trip_id).values(margin=margin))
+
+
+def downgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trip_sold_at'))
+        batch_op.drop_index(batch_op.f('ix_trip_created_at'))
+        batch_op.drop_index(batch_op.f('ix_trip_destination'))
+        batch_op.drop_index(batch_op.f('ix_trip_status'))
+        batch_op.drop_index(batch_op.f('ix_trip_margin'))
+        batch_op.drop_column('margin')
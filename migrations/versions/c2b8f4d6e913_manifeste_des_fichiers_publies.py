@@ -0,0 +1,33 @@
+"""Manifeste des fichiers publiés sur le site
+
+Revision ID: c2b8f4d6e913
+Revises: a7d3e9b1c254
+Create Date: 2026-10-19 17:21:45.036512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b8f4d6e913'
+down_revision = 'a7d3e9b1c254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('published_file',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('directory', sa.String(length=100), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('directory', 'filename', name='uq_published_file_path')
+    )
+
+
+def downgrade():
+    op.drop_table('published_file')
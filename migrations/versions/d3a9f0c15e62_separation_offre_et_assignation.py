@@ -0,0 +1,74 @@
+"""Séparation offre / assignation : full_data_json partagé dans trip_offer
+
+Revision ID: d3a9f0c15e62
+Revises: b41e7c9d2f10
+Create Date: 2026-10-19 10:02:17.734511
+
+"""
+import hashlib
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9f0c15e62'
+down_revision = 'b41e7c9d2f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    trip_offer_table = op.create_table('trip_offer',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('full_data_json', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('trip_offer', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_trip_offer_digest'), ['digest'], unique=True)
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('offer_id', sa.Integer(), nullable=True))
+
+    # Une seule offre par contenu identique : les copies faites à chaque assignation sont fusionnées
+    connection = op.get_bind()
+    trip_table = sa.table('trip', sa.column('id', sa.Integer), sa.column('full_data_json', sa.Text), sa.column('offer_id', sa.Integer))
+    offer_ids = {}
+    for trip_id, full_data_json in connection.execute(sa.select(trip_table.c.id, trip_table.c.full_data_json)).all():
+        digest = hashlib.sha256(full_data_json.encode('utf-8')).hexdigest()
+        if digest not in offer_ids:
+            result = connection.execute(trip_offer_table.insert().values(
+                digest=digest, full_data_json=full_data_json, created_at=datetime.utcnow()
+            ))
+            offer_ids[digest] = result.inserted_primary_key[0]
+        connection.execute(trip_table.update().where(trip_table.c.id == trip_id).values(offer_id=offer_ids[digest]))
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.alter_column('offer_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_trip_offer_id'), ['offer_id'], unique=False)
+        batch_op.create_foreign_key('fk_trip_offer_id_trip_offer', 'trip_offer', ['offer_id'], ['id'])
+        batch_op.drop_column('full_data_json')
+
+
+def downgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('full_data_json', sa.Text(), nullable=True))
+
+    connection = op.get_bind()
+    connection.execute(sa.text(
+        'UPDATE trip SET full_data_json = (SELECT trip_offer.full_data_json FROM trip_offer WHERE trip_offer.id = trip.offer_id)'
+    ))
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.alter_column('full_data_json', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_constraint('fk_trip_offer_id_trip_offer', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_trip_offer_id'))
+        batch_op.drop_column('offer_id')
+
+    with op.batch_alter_table('trip_offer', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trip_offer_digest'))
+
+    op.drop_table('trip_offer')
@@ -0,0 +1,83 @@
+"""Recherche plein texte des voyages
+
+Revision ID: d5f1a7c3b829
+Revises: c2b8f4d6e913
+Create Date: 2026-10-19 18:04:12.527391
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+import unidecode
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1a7c3b829'
+down_revision = 'c2b8f4d6e913'
+branch_labels = None
+depends_on = None
+
+SEARCH_FIELDS = ('hotel_name', 'destination', 'client_first_name', 'client_last_name', 'client_email', 'client_phone')
+
+
+COUNTRY_CODES = ('352', '212', '216', '213', '351', '32', '33', '31', '49', '44', '41', '34', '39', '30', '90', '20', '1')
+
+
+def _normalize(value):
+    # Mêmes règles que search.normalize_search_text
+    return re.sub(r'[^a-z0-9]+', ' ', unidecode.unidecode(value or '').lower()).strip()
+
+
+def _phone_terms(phone):
+    # Mêmes règles que search.phone_search_terms
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    national = None
+    if phone.strip().startswith('+') or digits.startswith('00'):
+        digits = digits[2:] if digits.startswith('00') else digits
+        code = next((code for code in COUNTRY_CODES if digits.startswith(code)), None)
+        if code:
+            national = digits[len(code):].lstrip('0')
+    elif digits.startswith('0'):
+        national = digits[1:]
+    terms = [digits]
+    if national:
+        terms += [f'0{national}', national]
+    return list(dict.fromkeys(terms))
+
+
+def upgrade():
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_text', sa.Text(), nullable=True))
+
+    # Texte de recherche des voyages existants
+    connection = op.get_bind()
+    trip_table = sa.table('trip', sa.column('id', sa.Integer), sa.column('search_text', sa.Text),
+                          *(sa.column(name, sa.String) for name in SEARCH_FIELDS))
+    rows = connection.execute(sa.select(trip_table.c.id, *(trip_table.c[name] for name in SEARCH_FIELDS))).all()
+    for row in rows:
+        values = dict(zip(SEARCH_FIELDS, row[1:]))
+        parts = [_normalize(values[name]) for name in SEARCH_FIELDS]
+        parts.extend(_phone_terms(values['client_phone']))
+        search_text = ' '.join(part for part in parts if part)
+        connection.execute(trip_table.update().where(trip_table.c.id == row[0]).values(search_text=search_text))
+
+    if connection.dialect.name == 'postgresql':
+        op.create_index('ix_trip_search_text', 'trip', [sa.text("to_tsvector('simple'::regconfig, search_text)")],
+                        unique=False, postgresql_using='gin')
+    elif connection.dialect.name == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS trip_search USING fts5(search_text)")
+        op.execute("INSERT INTO trip_search (rowid, search_text) SELECT id, search_text FROM trip")
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == 'postgresql':
+        op.drop_index('ix_trip_search_text', table_name='trip', postgresql_using='gin')
+    elif connection.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS trip_search")
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.drop_column('search_text')
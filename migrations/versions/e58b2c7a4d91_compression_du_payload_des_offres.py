@@ -0,0 +1,63 @@
+"""Compression zlib du payload des offres et dates extraites
+
+Revision ID: e58b2c7a4d91
+Revises: d3a9f0c15e62
+Create Date: 2026-10-19 10:48:03.902615
+
+"""
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58b2c7a4d91'
+down_revision = 'd3a9f0c15e62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trip_offer', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payload', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('date_start', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('date_end', sa.String(length=10), nullable=True))
+
+    connection = op.get_bind()
+    offer_table = sa.table('trip_offer',
+        sa.column('id', sa.Integer), sa.column('full_data_json', sa.Text), sa.column('payload', sa.LargeBinary),
+        sa.column('date_start', sa.String), sa.column('date_end', sa.String))
+    for offer_id, full_data_json in connection.execute(sa.select(offer_table.c.id, offer_table.c.full_data_json)).all():
+        try:
+            form_data = json.loads(full_data_json).get('form_data') or {}
+        except ValueError:
+            form_data = {}
+        connection.execute(offer_table.update().where(offer_table.c.id == offer_id).values(
+            payload=zlib.compress(full_data_json.encode('utf-8'), 6),
+            date_start=form_data.get('date_start'),
+            date_end=form_data.get('date_end'),
+        ))
+
+    with op.batch_alter_table('trip_offer', schema=None) as batch_op:
+        batch_op.alter_column('payload', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.drop_column('full_data_json')
+
+
+def downgrade():
+    with op.batch_alter_table('trip_offer', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('full_data_json', sa.Text(), nullable=True))
+
+    connection = op.get_bind()
+    offer_table = sa.table('trip_offer', sa.column('id', sa.Integer), sa.column('full_data_json', sa.Text), sa.column('payload', sa.LargeBinary))
+    for offer_id, payload in connection.execute(sa.select(offer_table.c.id, offer_table.c.payload)).all():
+        connection.execute(offer_table.update().where(offer_table.c.id == offer_id).values(
+            full_data_json=zlib.decompress(payload).decode('utf-8')
+        ))
+
+    with op.batch_alter_table('trip_offer', schema=None) as batch_op:
+        batch_op.alter_column('full_data_json', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('date_end')
+        batch_op.drop_column('date_start')
+        batch_op.drop_column('payload')
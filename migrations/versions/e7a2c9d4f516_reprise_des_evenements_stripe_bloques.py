@@ -0,0 +1,26 @@
+"""Reprise des événements Stripe bloqués en traitement
+
+Revision ID: e7a2c9d4f516
+Revises: d5f1a7c3b829
+Create Date: 2026-10-19 19:12:03.881245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c9d4f516'
+down_revision = 'd5f1a7c3b829'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.drop_column('claimed_at')
@@ -0,0 +1,40 @@
+"""Catalogue Stripe : un produit par voyage et un prix par montant
+
+Revision ID: f1c4e8a2b735
+Revises: e58b2c7a4d91
+Create Date: 2026-10-19 14:12:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c4e8a2b735'
+down_revision = 'e58b2c7a4d91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stripe_price',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('stripe_product_id', sa.String(length=255), nullable=False),
+    sa.Column('stripe_price_id', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['trip_id'], ['trip.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('trip_id', 'amount', 'currency', name='uq_stripe_price_trip_amount')
+    )
+    with op.batch_alter_table('stripe_price', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stripe_price_trip_id'), ['trip_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stripe_price', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stripe_price_trip_id'))
+
+    op.drop_table('stripe_price')
@@ -1,20 +1,117 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session, deferred
 from datetime import datetime
-import json
+import hashlib
+import zlib
+
+import fastjson
 
 db = SQLAlchemy()
 
+class TripOffer(db.Model):
+    """Données partagées d'une offre (enrichissement + prix), stockées une seule fois par contenu.
+
+    Les voyages assignés à des clients référencent la même offre tant que leurs données sont
+    identiques ; toute modification crée (ou retrouve) une autre offre, les autres voyages ne sont
+    donc jamais affectés.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    # JSON compressé (zlib), chargé uniquement quand on accède aux données complètes
+    payload = deferred(db.Column(db.LargeBinary, nullable=False))
+    # Dates du séjour recopiées du formulaire, pour les listes sans décompresser le payload
+    date_start = db.Column(db.String(10), nullable=True)
+    date_end = db.Column(db.String(10), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    trips = db.relationship('Trip', back_populates='offer', lazy=True)
+
+    @property
+    def full_data_json(self):
+        # Le contenu d'une offre ne change jamais : le décodage est mis en cache sur l'instance
+        if getattr(self, '_full_data_json', None) is None:
+            self._full_data_json = zlib.decompress(self.payload).decode('utf-8')
+        return self._full_data_json
+
+    @full_data_json.setter
+    def full_data_json(self, value):
+        self.payload = zlib.compress(value.encode('utf-8'), 6)
+        self._full_data_json = value
+        self._full_data = fastjson.loads(value)
+        form_data = self._full_data.get('form_data') or {}
+        self.date_start = form_data.get('date_start')
+        self.date_end = form_data.get('date_end')
+
+    @property
+    def full_data(self):
+        """Données de l'offre décodées une seule fois (à ne pas modifier : faire une copie)."""
+        if getattr(self, '_full_data', None) is None:
+            self._full_data = fastjson.loads(self.full_data_json)
+        return self._full_data
+
+    @staticmethod
+    def compute_digest(full_data_json):
+        return hashlib.sha256(full_data_json.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def for_payloads(cls, payloads):
+        """Retourne {digest: TripOffer} pour une liste de JSON, en réutilisant les offres existantes."""
+        by_digest = {cls.compute_digest(payload): payload for payload in payloads}
+        offers = {}
+        # Offres créées dans la session courante mais pas encore enregistrées
+        for obj in db.session.new:
+            if isinstance(obj, cls) and obj.digest in by_digest:
+                offers[obj.digest] = obj
+        missing = [digest for digest in by_digest if digest not in offers]
+        if missing:
+            with db.session.no_autoflush:
+                for offer in cls.query.filter(cls.digest.in_(missing)).all():
+                    offers[offer.digest] = offer
+        for digest, payload in by_digest.items():
+            if digest not in offers:
+                offer = cls(digest=digest, full_data_json=payload)
+                try:
+                    # Point de sauvegarde : la même offre peut être enregistrée en parallèle par une autre requête
+                    with db.session.begin_nested():
+                        db.session.add(offer)
+                except IntegrityError:
+                    offer = cls.query.filter_by(digest=digest).one()
+                offers[digest] = offer
+        return offers
+
+    @classmethod
+    def for_payload(cls, full_data_json):
+        return cls.for_payloads([full_data_json])[cls.compute_digest(full_data_json)]
+
+    def __repr__(self):
+        return f'<TripOffer {self.id}: {self.digest[:12]}>'
+
+def _mark_offer_orphan_candidate(session, offer_id):
+    if session is not None and offer_id is not None:
+        session.info.setdefault('offer_orphan_candidates', set()).add(offer_id)
+
 class Trip(db.Model):
+    __table_args__ = (
+        # Recherche plein texte sous PostgreSQL (SQLite utilise la table FTS5 trip_search)
+        db.Index('ix_trip_search_text', db.func.to_tsvector(db.literal_column("'simple'::regconfig"), db.text('search_text')),
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     
-    full_data_json = db.Column(db.Text, nullable=False)
+    offer_id = db.Column(db.Integer, db.ForeignKey('trip_offer.id'), nullable=False, index=True)
+    offer = db.relationship('TripOffer', back_populates='trips', lazy='joined')
     
     hotel_name = db.Column(db.String(200), nullable=False)
-    destination = db.Column(db.String(200), nullable=False)
+    destination = db.Column(db.String(200), nullable=False, index=True)
     price = db.Column(db.Integer, nullable=False)
+    # Copie de full_data['margin'] pour les agrégats SQL (statistiques)
+    margin = db.Column(db.Integer, nullable=True, index=True)
     
-    status = db.Column(db.String(50), nullable=False, default='proposed')
+    status = db.Column(db.String(50), nullable=False, default='proposed', index=True)
     
     is_published = db.Column(db.Boolean, default=False)
     published_filename = db.Column(db.String(255), nullable=True)
@@ -32,26 +129,72 @@ class Trip(db.Model):
 
     down_payment_amount = db.Column(db.Integer, nullable=True)
     balance_due_date = db.Column(db.Date, nullable=True)
+    # Paiements confirmés par les webhooks Stripe (en euros)
+    amount_paid = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    paid_at = db.Column(db.DateTime, nullable=True)
     
     document_filenames = db.Column(db.Text, nullable=True)
+    # Hôtel, destination et coordonnées du client sans accents ni ponctuation (voir search.py)
+    search_text = db.Column(db.Text, nullable=True)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     assigned_at = db.Column(db.DateTime, nullable=True)
-    sold_at = db.Column(db.DateTime, nullable=True)
+    sold_at = db.Column(db.DateTime, nullable=True, index=True)
     
     # Relation avec les factures
     invoices = db.relationship('Invoice', backref='trip', lazy=True, cascade="all, delete-orphan")
+    # Produits/prix Stripe déjà créés pour ce voyage
+    stripe_prices = db.relationship('StripePrice', backref='trip', lazy=True, cascade="all, delete-orphan")
+
+    @property
+    def full_data_json(self):
+        return self.offer.full_data_json if self.offer else None
+
+    @full_data_json.setter
+    def full_data_json(self, value):
+        if self.offer is not None and self.offer.digest == TripOffer.compute_digest(value):
+            return
+        if self.offer is not None:
+            _mark_offer_orphan_candidate(object_session(self), self.offer.id)
+        self.offer = TripOffer.for_payload(value)
+
+    @property
+    def full_data(self):
+        """Données complètes du voyage, décodées une fois par offre.
+
+        Le dictionnaire retourné est partagé : pour le modifier, travailler sur une copie
+        (copy.deepcopy) puis la réaffecter à trip.full_data.
+        """
+        return self.offer.full_data if self.offer else {}
+
+    @full_data.setter
+    def full_data(self, value):
+        self.full_data_json = fastjson.dumps(value)
+
+    @property
+    def form_data(self):
+        return self.full_data.get('form_data', {})
+
+    @property
+    def api_data(self):
+        return self.full_data.get('api_data', {})
+
+    @property
+    def savings(self):
+        return self.full_data.get('savings', 0)
+
+    @property
+    def comparison_total(self):
+        return self.full_data.get('comparison_total', 0)
 
     def to_dict(self):
         """Retourne une représentation dictionnaire du voyage."""
-        full_data = json.loads(self.full_data_json)
-        form_data = full_data.get('form_data', {})
-        
         return {
             'id': self.id,
             'hotel_name': self.hotel_name,
             'destination': self.destination,
             'price': self.price,
+            'margin': self.margin,
             'status': self.status,
             'is_published': self.is_published,
             'published_filename': self.published_filename,
@@ -65,8 +208,10 @@ class Trip(db.Model):
             'sold_at': self.sold_at.strftime('%d/%m/%Y') if self.sold_at else None,
             'down_payment_amount': self.down_payment_amount,
             'balance_due_date': self.balance_due_date.strftime('%d/%m/%Y') if self.balance_due_date else None,
-            'date_start': form_data.get('date_start'),
-            'date_end': form_data.get('date_end'),
+            'amount_paid': self.amount_paid or 0,
+            'paid_at': self.paid_at.strftime('%d/%m/%Y') if self.paid_at else None,
+            'date_start': self.offer.date_start if self.offer else None,
+            'date_end': self.offer.date_end if self.offer else None,
             'document_filenames': self.document_filenames.split(',') if self.document_filenames else [],
             # Ajout de la liste des factures
             'invoices': [invoice.to_dict() for invoice in self.invoices]
@@ -75,6 +220,24 @@ class Trip(db.Model):
     def __repr__(self):
         return f'<Trip {self.id}: {self.hotel_name} - {self.status}>'
 
+@event.listens_for(Trip, 'after_delete')
+def _trip_deleted(mapper, connection, trip):
+    _mark_offer_orphan_candidate(object_session(trip), trip.offer_id)
+
+@event.listens_for(Session, 'before_commit')
+def _purge_orphan_offers(session):
+    """Supprime les offres qui ne sont plus référencées par aucun voyage."""
+    if not session.info.get('offer_orphan_candidates') and not session.deleted:
+        return
+    session.flush()
+    candidates = session.info.pop('offer_orphan_candidates', None)
+    if not candidates:
+        return
+    orphans = session.query(TripOffer).filter(TripOffer.id.in_(candidates), ~TripOffer.trips.any()).all()
+    for offer in orphans:
+        session.delete(offer)
+    session.flush()
+
 class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -88,3 +251,49 @@ class Invoice(db.Model):
             'invoice_number': self.invoice_number,
             'created_at': self.created_at.strftime('%d/%m/%Y')
         }
+
+class StripePrice(db.Model):
+    """Produit et prix Stripe réutilisables pour un voyage et un montant donnés."""
+    __table_args__ = (db.UniqueConstraint('trip_id', 'amount', 'currency', name='uq_stripe_price_trip_amount'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trip.id'), nullable=False, index=True)
+    amount = db.Column(db.Integer, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default='eur')
+    stripe_product_id = db.Column(db.String(255), nullable=False)
+    stripe_price_id = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StripePrice {self.trip_id}: {self.amount} {self.currency}>'
+
+class StripeEvent(db.Model):
+    """Événement reçu sur le webhook Stripe, enregistré une seule fois puis traité en arrière-plan."""
+    id = db.Column(db.Integer, primary_key=True)
+    stripe_event_id = db.Column(db.String(255), nullable=False, unique=True)
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    # pending -> processing -> processed | ignored | failed
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Début du traitement : une réservation trop ancienne est reprise (processus arrêté en cours de lot)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<StripeEvent {self.stripe_event_id}: {self.type} - {self.status}>'
+
+class PublishedFile(db.Model):
+    """Fichier téléversé sur le site (manifeste local de ce qui est en ligne)."""
+    __table_args__ = (db.UniqueConstraint('directory', 'filename', name='uq_published_file_path'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    directory = db.Column(db.String(100), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    digest = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PublishedFile {self.directory}/{self.filename}>'
@@ -0,0 +1,128 @@
+# pricing.py - Calcul des prix, marges et économies des voyages
+import copy
+
+import numpy as np
+
+import fastjson
+
+from models import db, Trip, TripOffer
+
+# Ordre des colonnes dans les matrices de coûts
+COST_FIELDS = (
+    'hotel_b2b_price',
+    'hotel_b2c_price',
+    'pack_price',
+    'flight_price',
+    'transfer_cost',
+    'surcharge_cost',
+    'car_rental_cost',
+)
+# Coûts communs aux totaux B2B et B2C (vol, transferts, pension, voiture)
+SHARED_COST_FIELDS = COST_FIELDS[3:]
+
+
+def _cost_row(form_data):
+    """Convertit les coûts du formulaire en liste d'entiers (ValueError/TypeError si invalide)."""
+    return [int(form_data.get(field) or 0) for field in COST_FIELDS]
+
+
+def compute_pricing_batch(costs):
+    """Calcule marge, total comparatif et économie pour une matrice (n, len(COST_FIELDS)) de coûts."""
+    costs = np.asarray(costs, dtype=np.int64).reshape(-1, len(COST_FIELDS))
+    hotel_b2b = costs[:, 0]
+    hotel_b2c = costs[:, 1]
+    pack_price = costs[:, 2]
+    shared_costs = costs[:, 3:].sum(axis=1)
+
+    comparison_total = hotel_b2c + shared_costs
+    return {
+        'margin': pack_price - (hotel_b2b + shared_costs),
+        'comparison_total': comparison_total,
+        'savings': comparison_total - pack_price,
+    }
+
+
+def compute_pricing(form_data):
+    """Calcule la marge, le total comparatif et l'économie client à partir des prix du formulaire."""
+    try:
+        row = _cost_row(form_data)
+    except (ValueError, TypeError):
+        return {'margin': 0, 'savings': 0, 'comparison_total': 0}
+
+    result = compute_pricing_batch([row])
+    return {
+        'margin': int(result['margin'][0]),
+        'savings': int(result['savings'][0]),
+        'comparison_total': int(result['comparison_total'][0]),
+    }
+
+
+def reprice_trips(trips, set_values=None, adjustments=None):
+    """Applique de nouveaux coûts à un ensemble de voyages et recalcule leurs prix en une seule passe.
+
+    set_values remplace la valeur d'un coût (ex: {'flight_price': 250}), adjustments l'augmente
+    ou la diminue (ex: {'surcharge_cost': 30}). Les résultats sont écrits en une seule mise à jour groupée.
+    Retourne la liste des voyages modifiés : ceux dont le formulaire est illisible, ou dont l'offre
+    ne change pas, sont laissés tels quels.
+    """
+    set_values = set_values or {}
+    adjustments = adjustments or {}
+    unknown_fields = (set(set_values) | set(adjustments)) - set(COST_FIELDS)
+    if unknown_fields:
+        raise ValueError(f"Champs de coût inconnus : {', '.join(sorted(unknown_fields))}")
+
+    trips = list(trips)
+    if not trips:
+        return []
+
+    payloads = [copy.deepcopy(trip.full_data) for trip in trips]
+    costs = np.zeros((len(trips), len(COST_FIELDS)), dtype=np.int64)
+    valid = np.ones(len(trips), dtype=bool)
+    for i, full_data in enumerate(payloads):
+        try:
+            costs[i] = _cost_row(full_data.get('form_data', {}))
+        except (ValueError, TypeError):
+            valid[i] = False
+
+    for field, value in set_values.items():
+        costs[:, COST_FIELDS.index(field)] = int(value)
+    for field, delta in adjustments.items():
+        costs[:, COST_FIELDS.index(field)] += int(delta)
+
+    result = compute_pricing_batch(costs)
+
+    # Les formulaires illisibles sont laissés tels quels : aucun coût de référence à modifier
+    changed = []
+    for i, full_data in enumerate(payloads):
+        if not valid[i]:
+            continue
+        form_data = full_data.setdefault('form_data', {})
+        for field in set(set_values) | set(adjustments):
+            form_data[field] = str(costs[i, COST_FIELDS.index(field)])
+        full_data['margin'] = int(result['margin'][i])
+        full_data['comparison_total'] = int(result['comparison_total'][i])
+        full_data['savings'] = int(result['savings'][i])
+        payload = fastjson.dumps(full_data)
+        if trips[i].offer is None or TripOffer.compute_digest(payload) != trips[i].offer.digest:
+            changed.append((i, payload))
+    if not changed:
+        return []
+
+    # Les voyages qui partageaient une offre retombent sur une même nouvelle offre
+    offers = TripOffer.for_payloads([payload for _, payload in changed])
+    db.session.flush()
+
+    mappings = []
+    orphan_candidates = db.session.info.setdefault('offer_orphan_candidates', set())
+    for i, payload in changed:
+        orphan_candidates.add(trips[i].offer_id)
+        mappings.append({
+            'id': trips[i].id,
+            'price': int(costs[i, COST_FIELDS.index('pack_price')]),
+            'margin': int(result['margin'][i]),
+            'offer_id': offers[TripOffer.compute_digest(payload)].id,
+        })
+
+    db.session.bulk_update_mappings(Trip, mappings)
+    db.session.commit()
+    return [trips[i] for i, _ in changed]
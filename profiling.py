@@ -0,0 +1,169 @@
+# profiling.py - Profilage à la demande des requêtes lentes (pyinstrument si installé, sinon cProfile)
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request, session
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # pragma: no cover - pyinstrument est optionnel
+    InstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+_FILENAME_RE = re.compile(r'^[\w.-]+\.(html|prof|txt)$')
+# Un seul profil à la fois par processus (depuis Python 3.12, cProfile est global au processus)
+_active = threading.Lock()
+
+
+class _RequestProfiler:
+    """Profileur d'une requête, limité au thread qui la traite."""
+
+    def __init__(self):
+        if InstrumentProfiler is not None:
+            self._profiler = InstrumentProfiler(async_mode='disabled')
+            self.extension = 'html'
+        else:
+            self._profiler = cProfile.Profile()
+            self.extension = 'prof'
+
+    def start(self):
+        if InstrumentProfiler is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if InstrumentProfiler is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, path):
+        if InstrumentProfiler is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._profiler.output_html())
+            return
+        self._profiler.dump_stats(path)
+        # Résumé lisible à côté du fichier binaire (pour un coup d'œil sans snakeviz)
+        summary = io.StringIO()
+        pstats.Stats(self._profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+        with open(f"{path[:-len('.prof')]}.txt", 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+
+
+class ProfileStore:
+    """Dossier local des profils capturés, avec une limite sur le nombre de fichiers conservés."""
+
+    def __init__(self, directory, max_files=200):
+        self.directory = directory
+        self.max_files = max_files
+
+    def path_for(self, endpoint, method, duration_ms, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        safe_endpoint = re.sub(r'[^\w]+', '_', endpoint or 'unmatched')
+        return os.path.join(self.directory, f"{timestamp}-{method}-{safe_endpoint}-{duration_ms}ms.{extension}")
+
+    def _names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if _FILENAME_RE.match(name)]
+
+    def list(self):
+        entries = []
+        for name in self._names():
+            stat = os.stat(os.path.join(self.directory, name))
+            parts = name.rsplit('.', 1)[0].split('-')
+            entries.append({
+                'filename': name,
+                'size': stat.st_size,
+                'created_at': datetime.utcfromtimestamp(stat.st_mtime).isoformat(timespec='seconds'),
+                'method': parts[1] if len(parts) > 3 else None,
+                'endpoint': '-'.join(parts[2:-1]) if len(parts) > 3 else None,
+                'duration_ms': int(parts[-1][:-2]) if parts[-1].endswith('ms') and parts[-1][:-2].isdigit() else None,
+            })
+        return sorted(entries, key=lambda e: e['filename'], reverse=True)
+
+    def is_valid_name(self, filename):
+        return bool(_FILENAME_RE.match(filename)) and os.path.exists(os.path.join(self.directory, filename))
+
+    def prune(self):
+        names = sorted(self._names())
+        for name in names[:-self.max_files] if len(names) > self.max_files else []:
+            os.remove(os.path.join(self.directory, name))
+
+
+def init_profiling(app, store):
+    """Profile les requêtes (toutes par défaut, PROFILE_SAMPLE_RATE pour un échantillon) et garde celles
+    qui dépassent le seuil.
+
+    Une requête d'un utilisateur connecté portant l'en-tête X-Profile: 1 est toujours profilée
+    et conservée, même si le profilage automatique est désactivé.
+    """
+    enabled = app.config.get('PROFILING_ENABLED')
+    threshold_ms = app.config.get('PROFILE_THRESHOLD_MS') or 2000
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE')
+    sample_rate = 1.0 if sample_rate is None else sample_rate
+
+    @app.before_request
+    def _start_profiler():
+        forced = request.headers.get(PROFILE_HEADER) == '1' and session.get('authenticated', False)
+        if not forced and not (enabled and random.random() < sample_rate):
+            return
+        if not _active.acquire(blocking=False):
+            return
+        try:
+            profiler = _RequestProfiler()
+            profiler.start()
+        except Exception as e:
+            _active.release()
+            logger.warning("⚠️ Profilage impossible pour cette requête: %s", e)
+            return
+        g.profiling = (profiler, time.perf_counter(), forced)
+
+    @app.after_request
+    def _stop_profiler(response):
+        state = g.pop('profiling', None)
+        if state is None:
+            return response
+        profiler, start, forced = state
+        endpoint, method = request.endpoint, request.method
+
+        def finish():
+            profiler.stop()
+            _active.release()
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            if not forced and duration_ms < threshold_ms:
+                return
+            path = store.path_for(endpoint, method, duration_ms, profiler.extension)
+            try:
+                profiler.save(path)
+                store.prune()
+                logger.info("🐢 Profil enregistré pour %s %s (%d ms): %s", method, endpoint, duration_ms, os.path.basename(path))
+            except OSError as e:
+                logger.error("❌ Impossible d'enregistrer le profil: %s", e)
+
+        if response.is_streamed:
+            # Le flux est produit après cette fonction, dans le même thread
+            response.call_on_close(finish)
+        else:
+            finish()
+        return response
+
+    @app.teardown_request
+    def _abandon_profiler(exc):
+        # after_request n'a pas été appelé (exception non gérée) : on libère le profileur
+        state = g.pop('profiling', None)
+        if state is not None:
+            state[0].stop()
+            _active.release()
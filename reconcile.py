@@ -0,0 +1,162 @@
+# reconcile.py - Comparaison des pages en ligne (offres/, clients/) avec la base et correction des écarts
+import logging
+import re
+from dataclasses import dataclass, field
+
+from sqlalchemy import or_
+
+from artifacts import compressed_variants
+from feed import FEED_DIRECTORY, FEED_FILENAME
+from models import db, Trip
+
+logger = logging.getLogger(__name__)
+
+PAGE_DIRECTORIES = ('offres', 'clients')
+# Noms produits par PublicationService : hotel_AAAA-MM-JJ_AAAA-MM-JJ[_client].html (+ .gz, .br)
+PAGE_FILENAME_RE = re.compile(r'^[a-z0-9_]+_\d{4}-\d{2}-\d{2}_\d{4}-\d{2}-\d{2}(_[a-z0-9_]+)?\.html(\.gz|\.br)?$')
+
+
+@dataclass
+class ReconciliationPlan:
+    deletes: list = field(default_factory=list)            # [(dossier, fichier)] orphelins en ligne
+    republish_public: dict = field(default_factory=dict)   # {trip_id: [fichiers manquants ou modifiés]}
+    republish_client: dict = field(default_factory=dict)
+    publish_feed: bool = False
+    stale_entries: list = field(default_factory=list)      # [(dossier, fichier)] à retirer du manifeste
+    unknown: list = field(default_factory=list)            # [(dossier, fichier)] non écrits par l'application : conservés
+
+    @property
+    def is_empty(self):
+        return not (self.deletes or self.republish_public or self.republish_client or self.publish_feed)
+
+
+def _page_files(filename):
+    # Mêmes variantes que celles produites à la publication (.gz, et .br si Brotli est installé)
+    return [filename] + [f"{filename}{extension}" for extension in compressed_variants(b'')]
+
+
+def desired_files():
+    """{dossier: {fichier: (type, trip_id)}} : ce qui devrait être en ligne d'après la base."""
+    desired = {directory: {} for directory in PAGE_DIRECTORIES}
+    desired[FEED_DIRECTORY][FEED_FILENAME] = ('feed', None)
+    trips = Trip.query.filter(or_(Trip.is_published.is_(True), Trip.client_published_filename.isnot(None)))
+    for trip in trips:
+        if trip.is_published and trip.published_filename:
+            for name in _page_files(trip.published_filename):
+                desired['offres'][name] = ('public', trip.id)
+        if trip.client_published_filename:
+            for name in _page_files(trip.client_published_filename):
+                desired['clients'][name] = ('client', trip.id)
+    return desired
+
+
+def _is_drifted(remote, entry):
+    """Le fichier en ligne diffère-t-il de ce que nous avons envoyé ?"""
+    if entry is None:
+        # Envoyé avant l'existence du manifeste : contenu inconnu, on le garde tel quel
+        return False
+    if remote.get('sha256'):
+        return remote['sha256'] != entry.digest
+    return remote.get('size') is not None and int(remote['size']) != entry.size
+
+
+def plan_reconciliation(remote_files, desired, manifest_entries):
+    """Calcule le minimum d'envois et de suppressions pour aligner le site sur la base.
+
+    remote_files : {dossier: [{'filename', 'size', 'sha256'?}]} (liste renvoyée par l'API)
+    manifest_entries : {dossier: {fichier: PublishedFile}}
+    """
+    plan = ReconciliationPlan()
+
+    def needs_upload(directory, filename):
+        kind, trip_id = desired[directory][filename]
+        if kind == 'feed':
+            plan.publish_feed = True
+        else:
+            target = plan.republish_public if kind == 'public' else plan.republish_client
+            target.setdefault(trip_id, []).append(filename)
+        if filename in manifest_entries[directory]:
+            plan.stale_entries.append((directory, filename))
+
+    for directory in PAGE_DIRECTORIES:
+        remote = {item['filename']: item for item in remote_files[directory]}
+        for filename, item in sorted(remote.items()):
+            if filename not in desired[directory]:
+                # Seuls nos propres fichiers sont supprimés (.htaccess, pages déposées à la main... restent)
+                if filename in manifest_entries[directory] or PAGE_FILENAME_RE.match(filename):
+                    plan.deletes.append((directory, filename))
+                else:
+                    plan.unknown.append((directory, filename))
+            elif _is_drifted(item, manifest_entries[directory].get(filename)):
+                needs_upload(directory, filename)
+        for filename in sorted(set(desired[directory]) - set(remote)):
+            needs_upload(directory, filename)
+        # Entrées du manifeste pour des fichiers absents et non voulus : simple ménage
+        for filename in sorted(set(manifest_entries[directory]) - set(remote) - set(desired[directory])):
+            plan.stale_entries.append((directory, filename))
+    return plan
+
+
+def _republish(trip, publish, filename_attr, publication_service, directory, deleted):
+    old_filename = getattr(trip, filename_attr)
+    filename = publish(trip)
+    if not filename:
+        return False
+    if filename != old_filename:
+        # Le nom dépend de l'hôtel et des dates : l'ancienne page devient orpheline
+        setattr(trip, filename_attr, filename)
+        for name in _page_files(old_filename):
+            # Déjà supprimée avec les orphelins du plan : une seconde suppression échouerait
+            if (directory, name) not in deleted:
+                publication_service.delete_file(name, directory)
+                deleted.add((directory, name))
+    return True
+
+
+def apply_plan(plan, publication_service, feed_publisher):
+    """Exécute le plan et retourne le nombre d'échecs."""
+    manifest = publication_service.manifest
+    failures = 0
+    for directory, filename in plan.stale_entries:
+        # Oublier l'entrée force le réenvoi : le manifeste ne doit plus croire le fichier en ligne
+        manifest.forget(directory, filename)
+
+    deleted = set()
+    for directory, filename in plan.deletes:
+        failures += not publication_service.delete_file(filename, directory)
+        deleted.add((directory, filename))
+
+    for trip_id in plan.republish_public:
+        trip = db.session.get(Trip, trip_id)
+        failures += not _republish(trip, publication_service.publish_public_offer, 'published_filename',
+                                   publication_service, 'offres', deleted)
+    for trip_id in plan.republish_client:
+        trip = db.session.get(Trip, trip_id)
+        failures += not _republish(trip, publication_service.publish_client_offer, 'client_published_filename',
+                                   publication_service, 'clients', deleted)
+    db.session.commit()
+
+    if plan.publish_feed:
+        failures += not feed_publisher.publish()
+    return failures
+
+
+def reconcile(publication_service, feed_publisher, dry_run=False):
+    """Liste le site, calcule le plan et l'applique (sauf dry_run). Retourne (plan, échecs) ou (None, None)."""
+    remote_files = {}
+    for directory in PAGE_DIRECTORIES:
+        files = publication_service.list_remote(directory)
+        if files is None:
+            return None, None
+        remote_files[directory] = files
+
+    manifest_entries = {directory: publication_service.manifest.entries(directory) for directory in PAGE_DIRECTORIES}
+    plan = plan_reconciliation(remote_files, desired_files(), manifest_entries)
+    for directory, filename in plan.unknown:
+        logger.warning("❓ %s/%s inconnu de l'application : conservé", directory, filename)
+    if dry_run or plan.is_empty:
+        return plan, 0
+    failures = apply_plan(plan, publication_service, feed_publisher)
+    logger.info("🔁 Réconciliation terminée: %d suppressions, %d pages republiées, %d échecs",
+                len(plan.deletes), len(plan.republish_public) + len(plan.republish_client), failures)
+    return plan, failures
@@ -0,0 +1,143 @@
+# search.py - Recherche plein texte des voyages (hôtel, destination, client) sans tenir compte des accents
+import logging
+import re
+
+import unidecode
+from sqlalchemy import DDL, column, event, func, inspect, literal_column, table, text
+from sqlalchemy.orm import selectinload
+
+from models import db, Trip
+
+logger = logging.getLogger(__name__)
+
+# Colonnes couvertes par la recherche (recopiées, normalisées, dans Trip.search_text)
+SEARCH_FIELDS = ('hotel_name', 'destination', 'client_first_name', 'client_last_name', 'client_email', 'client_phone')
+SQLITE_FTS_TABLE = 'trip_search'
+# Indicatifs des clients de l'agence, les plus longs d'abord ('352' avant '35')
+COUNTRY_CODES = ('352', '212', '216', '213', '351', '32', '33', '31', '49', '44', '41', '34', '39', '30', '90', '20', '1')
+MAX_PER_PAGE = 50
+
+_TS_CONFIG = literal_column("'simple'::regconfig")
+_fts_table = table(SQLITE_FTS_TABLE, column('rowid'))
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+_sqlite_fts_available = {}
+
+
+def normalize_search_text(value):
+    """'Hôtel Mövenpick, Hurghada' -> 'hotel movenpick hurghada' (mêmes règles pour l'index et la saisie)."""
+    return _NON_ALNUM_RE.sub(' ', unidecode.unidecode(value or '').lower()).strip()
+
+
+def phone_search_terms(phone):
+    """'+32 470 12 34 56' -> ['32470123456', '0470123456', '470123456'].
+
+    Le numéro est indexé tel que saisi, au format national ('0470...') et sans le 0 initial,
+    pour qu'une recherche par préfixe ('0470123', '470123') le retrouve.
+    """
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    national = None
+    international = phone.strip().startswith('+') or digits.startswith('00')
+    if international:
+        digits = digits[2:] if digits.startswith('00') else digits
+        code = next((code for code in COUNTRY_CODES if digits.startswith(code)), None)
+        if code:
+            national = digits[len(code):].lstrip('0')
+    elif digits.startswith('0'):
+        national = digits[1:]
+    terms = [digits]
+    if national:
+        terms += [f'0{national}', national]
+    return list(dict.fromkeys(terms))
+
+
+def trip_search_text(trip):
+    parts = [normalize_search_text(getattr(trip, name)) for name in SEARCH_FIELDS]
+    parts.extend(phone_search_terms(trip.client_phone))
+    return ' '.join(part for part in parts if part)
+
+
+@event.listens_for(Trip, 'before_insert')
+@event.listens_for(Trip, 'before_update')
+def _update_search_text(mapper, connection, trip):
+    search_text = trip_search_text(trip)
+    if trip.search_text != search_text:
+        trip.search_text = search_text
+
+
+# --- SQLite (développement) : table FTS5 tenue à jour par l'ORM ---
+
+# Créée avec la table trip par db.create_all() ; la migration fait de même sur une base existante
+event.listen(Trip.__table__, 'after_create', DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(search_text)"
+).execute_if(dialect='sqlite'))
+
+
+def _has_sqlite_fts(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    key = connection.engine.url
+    if key not in _sqlite_fts_available:
+        _sqlite_fts_available[key] = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': SQLITE_FTS_TABLE}
+        ).first() is not None
+        if not _sqlite_fts_available[key]:
+            logger.warning("⚠️ Table %s absente : recherche des voyages par LIKE (flask db upgrade)", SQLITE_FTS_TABLE)
+    return _sqlite_fts_available[key]
+
+
+@event.listens_for(Trip, 'after_insert')
+@event.listens_for(Trip, 'after_update')
+def _index_trip(mapper, connection, trip):
+    if not inspect(trip).attrs.search_text.history.has_changes():
+        return
+    if _has_sqlite_fts(connection):
+        connection.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :id"), {'id': trip.id})
+        connection.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_text) VALUES (:id, :search_text)"),
+                           {'id': trip.id, 'search_text': trip.search_text})
+
+
+@event.listens_for(Trip, 'after_delete')
+def _unindex_trip(mapper, connection, trip):
+    if _has_sqlite_fts(connection):
+        connection.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :id"), {'id': trip.id})
+
+
+# --- Recherche ---
+
+def _ranked_query(words):
+    """Requête filtrée et triée par pertinence selon le moteur disponible."""
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Même expression que l'index GIN ix_trip_search_text ; chaque mot est un préfixe ('movenp:*')
+        vector = func.to_tsvector(_TS_CONFIG, Trip.search_text)
+        tsquery = func.to_tsquery(_TS_CONFIG, ' & '.join(f'{word}:*' for word in words))
+        return Trip.query.filter(vector.op('@@')(tsquery)).order_by(
+            func.ts_rank(vector, tsquery).desc(), Trip.created_at.desc())
+
+    if _has_sqlite_fts(connection):
+        match = ' '.join(f'"{word}"*' for word in words)
+        return (Trip.query.join(_fts_table, _fts_table.c.rowid == Trip.id)
+                .filter(text(f"{SQLITE_FTS_TABLE} MATCH :match").bindparams(match=match))
+                .order_by(text(f"bm25({SQLITE_FTS_TABLE})"), Trip.created_at.desc()))
+
+    # Sans index plein texte : chaque mot doit apparaître, les plus récents d'abord
+    query = Trip.query
+    for word in words:
+        query = query.filter(Trip.search_text.like(f'%{word}%'))
+    return query.order_by(Trip.created_at.desc())
+
+
+def search_trips(query, page=1, per_page=20, status=None):
+    """Voyages correspondant à tous les mots de `query`, du plus pertinent au moins pertinent.
+
+    Retourne une pagination Flask-SQLAlchemy (items, total, page, pages), ou None si la saisie est vide.
+    """
+    words = normalize_search_text(query).split()
+    if not words:
+        return None
+    trips = _ranked_query(words).options(selectinload(Trip.invoices))
+    if status:
+        trips = trips.filter(Trip.status == status)
+    return trips.paginate(page=page, per_page=per_page, max_per_page=MAX_PER_PAGE, error_out=False)
@@ -1,27 +1,70 @@
 # services.py - Version finale, corrigée et complète
 import os
+import copy
+import hashlib
+import html
+import contextvars
+import logging
 import requests
 import json
 import re
 import base64
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import google.generativeai as genai
 from bs4 import BeautifulSoup
 import unidecode
 
+import metrics
+from artifacts import VARIANT_EXTENSIONS, compressed_variants, minify_html
+from images import ImagePipeline, public_image_url
+
+logger = logging.getLogger(__name__)
+
+# Langue demandée aux API (avis Google, réponses Gemini)
+ENRICHMENT_LANGUAGE = 'fr'
+
+# Entrées dont dépend chaque source d'enrichissement : une source n'est
+# ré-interrogée que si l'une de ses entrées a changé.
+ENRICHMENT_SOURCE_INPUTS = {
+    'photos': ('hotel_name', 'destination'),
+    'reviews': ('hotel_name', 'destination', 'language'),
+    'videos': ('hotel_name', 'destination'),
+    'attractions': ('destination', 'language'),
+}
+
+# Points d'accès par défaut des API externes (surchargeables, par exemple vers des serveurs de benchmark)
+PLACES_API_BASE = 'https://maps.googleapis.com/maps/api/place'
+YOUTUBE_API_BASE = 'https://www.googleapis.com/youtube/v3'
+UPLOAD_API_URL = 'https://www.voyages-privileges.be/api/upload.php'
+# Miniature servie par YouTube pour chaque vidéo (utilisée si l'API n'en fournit pas)
+YOUTUBE_THUMBNAIL_URL = 'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'
+
+# Feuille Tailwind purgée, générée par build_offer_css.py et insérée dans chaque offre
+OFFER_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'offer_critical.css')
+TAILWIND_CDN_URL = 'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css'
+# Format le plus courant des photos Places demandées en maxwidth=800 (paysage 3:2)
+PLACES_PHOTO_SIZE = (800, 533)
+_offer_stylesheet_html = None
+
 class PublicationService:
-    def __init__(self, config):
-        self.api_url = 'https://www.voyages-privileges.be/api/upload.php'
-        self.api_key = 'SecretUploadKey2025'
+    def __init__(self, config, manifest=None):
+        self.api_url = config.get('UPLOAD_API_URL') or UPLOAD_API_URL
+        self.api_key = config.get('UPLOAD_API_KEY') or 'SecretUploadKey2025'
+        # Manifeste des fichiers en ligne (manifest.PublicationManifest) : évite les réenvois identiques
+        self.manifest = manifest
+        self.image_pipeline = ImagePipeline(config, uploader=self._upload_via_api)
         
-        print(f"📡 Configuration Publication:")
-        print(f"   Mode: API HTTP (Railway compatible)")
-        print(f"   API URL: {self.api_url}")
+        logger.info("📡 Publication via API HTTP (Railway compatible): %s", self.api_url)
 
     def _upload_via_api(self, filename, content_bytes, directory):
         """Méthode unifiée pour uploader des fichiers (HTML ou documents)."""
+        digest = hashlib.sha256(content_bytes).hexdigest()
+        if self.manifest is not None and self.manifest.is_current(directory, filename, digest):
+            logger.debug("⏭️ %s/%s inchangé, pas de réenvoi", directory, filename)
+            return True
         try:
-            print(f"📤 Upload via API: {filename} vers {directory}/")
+            logger.debug("📤 Upload via API: %s vers %s/", filename, directory)
             
             content_base64 = base64.b64encode(content_bytes).decode('utf-8')
             
@@ -36,25 +79,44 @@ class PublicationService:
                 'X-Api-Key': self.api_key 
             }
             
-            response = requests.post(
-                self.api_url,
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
+            with metrics.upstream('upload') as call:
+                response = call.record(requests.post(
+                    self.api_url,
+                    json=payload,
+                    headers=headers,
+                    timeout=30
+                ))
             
             if response.status_code == 200 and response.json().get('success'):
                 result = response.json()
-                print(f"✅ Upload réussi: {result.get('url', '')}")
+                logger.info("✅ Upload réussi: %s", result.get('url', ''), extra={'sample_rate': 0.1})
+                if self.manifest is not None:
+                    self.manifest.record(directory, filename, digest, len(content_bytes))
                 return True
             else:
-                print(f"❌ Erreur API (HTTP {response.status_code}): {response.text}")
+                logger.error("❌ Erreur API (HTTP %s): %s", response.status_code, response.text)
                 return False
                 
         except Exception as e:
-            print(f"❌ Erreur critique lors de l'upload: {e}")
+            logger.exception("❌ Erreur critique lors de l'upload: %s", e)
             return False
 
+    def _upload_page(self, filename, html_content, directory):
+        """Téléverse une page minifiée puis ses variantes .gz/.br, servies telles quelles par l'hébergeur."""
+        content_bytes = minify_html(html_content).encode('utf-8')
+        if not self._upload_via_api(filename, content_bytes, directory):
+            return False
+        for extension, variant in compressed_variants(content_bytes).items():
+            if not self._upload_via_api(f"{filename}{extension}", variant, directory):
+                # Une ancienne variante ne doit pas masquer la nouvelle page : on la retire
+                logger.warning("⚠️ Variante %s%s non téléversée, suppression de l'ancienne", filename, extension)
+                self._delete_via_api(f"{filename}{extension}", directory)
+        return True
+
+    def upload_file(self, filename, content_bytes, directory):
+        """Téléverse un fichier tel quel dans un dossier du site (ignoré s'il y est déjà à l'identique)."""
+        return self._upload_via_api(filename, content_bytes, directory)
+
     def upload_document(self, filename, file_content_bytes, trip_id):
         """Téléverse un document (PDF, etc.) dans un sous-dossier spécifique au voyage."""
         directory = f"documents/{trip_id}"
@@ -64,13 +126,14 @@ class PublicationService:
         """Télécharge un document depuis le serveur."""
         try:
             url = f"https://www.voyages-privileges.be/documents/{trip_id}/{filename}"
-            response = requests.get(url, timeout=30)
+            with metrics.upstream('site') as call:
+                response = call.record(requests.get(url, timeout=30))
             if response.status_code == 200:
                 return response.content
-            print(f"❌ Document non trouvé (HTTP {response.status_code}): {url}")
+            logger.warning("❌ Document non trouvé (HTTP %s): %s", response.status_code, url)
             return None
         except Exception as e:
-            print(f"❌ Erreur de téléchargement du document: {e}")
+            logger.exception("❌ Erreur de téléchargement du document: %s", e)
             return None
 
     def _generate_base_filename(self, trip_data):
@@ -81,46 +144,69 @@ class PublicationService:
         base_name = re.sub(r'[^a-z0-9]+', '_', base_name).strip('_')
         return f"{base_name}_{date_start}_{date_end}"
 
+    def ensure_image(self, trip, url):
+        """Déclinaisons d'une photo du voyage, générées et mémorisées dans full_data au besoin (None si échec)."""
+        full_trip_data = trip.full_data
+        images = full_trip_data['api_data'].get('images') or {}
+        if url in images:
+            return images[url]
+        derivatives = self.image_pipeline.process_all([url]).get(url)
+        if derivatives:
+            updated_trip_data = copy.deepcopy(full_trip_data)
+            updated_trip_data['api_data']['images'] = dict(images, **{url: derivatives})
+            trip.full_data = updated_trip_data
+        return derivatives
+
+    def _render_offer_html(self, trip, full_trip_data):
+        """Génère le HTML d'une offre avec des images redimensionnées hébergées sur notre site."""
+        api_data = full_trip_data['api_data']
+        images = dict(api_data.get('images') or {})
+        wanted_urls = api_data.get('photos', []) + [api_data.get('cultural_attraction_image')]
+        if api_data.get('videos'):
+            wanted_urls.append(video_thumbnail_url(api_data['videos'][0]))
+        missing_urls = [url for url in wanted_urls if url and url not in images]
+        if missing_urls:
+            images.update(self.image_pipeline.process_all(missing_urls))
+            # Mémorise les déclinaisons pour ne plus retélécharger ces photos
+            updated_trip_data = copy.deepcopy(full_trip_data)
+            updated_trip_data['api_data']['images'] = images
+            trip.full_data = updated_trip_data
+
+        return generate_travel_page_html(
+            full_trip_data['form_data'],
+            api_data,
+            full_trip_data.get('savings', 0),
+            full_trip_data.get('comparison_total', 0),
+            images=images
+        )
+
     def publish_public_offer(self, trip):
         """Publie une offre dans le dossier public /offres/"""
-        full_trip_data = json.loads(trip.full_data_json)
+        full_trip_data = trip.full_data
         base_filename = self._generate_base_filename(full_trip_data)
         filename = f"{base_filename}.html"
-        html_content = generate_travel_page_html(
-            full_trip_data['form_data'],
-            full_trip_data['api_data'],
-            full_trip_data.get('savings', 0),
-            full_trip_data.get('comparison_total', 0)
-        )
-        if self._upload_via_api(filename, html_content.encode('utf-8'), 'offres'):
+        html_content = self._render_offer_html(trip, full_trip_data)
+        if self._upload_page(filename, html_content, 'offres'):
             return filename
         return None
 
     def publish_client_offer(self, trip):
         """Publie une offre privée dans le dossier /clients/"""
-        full_trip_data = json.loads(trip.full_data_json)
+        full_trip_data = trip.full_data
         base_filename = self._generate_base_filename(full_trip_data)
         raw_name = f"{trip.client_first_name} {trip.client_last_name}"
         slug = unidecode.unidecode(raw_name).lower()
         slug = re.sub(r"[\s']+", '_', slug)
         client_name_slug = re.sub(r'[^a-z0-9_]', '', slug)
         filename = f"{base_filename}_{client_name_slug}.html"
-        html_content = generate_travel_page_html(
-            full_trip_data['form_data'],
-            full_trip_data['api_data'],
-            full_trip_data.get('savings', 0),
-            full_trip_data.get('comparison_total', 0)
-        )
-        if self._upload_via_api(filename, html_content.encode('utf-8'), 'clients'):
+        html_content = self._render_offer_html(trip, full_trip_data)
+        if self._upload_page(filename, html_content, 'clients'):
             return filename
         return None
 
-    def unpublish(self, filename, is_client_offer=False):
+    def _delete_via_api(self, filename, directory):
         """Supprime un fichier publié via l'API"""
         try:
-            directory = 'clients' if is_client_offer else 'offres'
-            print(f"🗑️ Suppression via API: {filename} dans {directory}/")
-            
             payload = {
                 'filename': filename,
                 'directory': directory
@@ -130,46 +216,92 @@ class PublicationService:
                 'Content-Type': 'application/json',
                 'X-Api-Key': self.api_key
             }
-            response = requests.delete(
-                self.api_url,
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
+            with metrics.upstream('upload') as call:
+                response = call.record(requests.delete(
+                    self.api_url,
+                    json=payload,
+                    headers=headers,
+                    timeout=30
+                ))
             if response.status_code == 200 and response.json().get('success'):
-                print(f"✅ Suppression réussie: {filename}")
+                logger.info("✅ Suppression réussie: %s", filename)
+                if self.manifest is not None:
+                    self.manifest.forget(directory, filename)
                 return True
-            print(f"❌ Erreur suppression (HTTP {response.status_code}): {response.text}")
+            logger.error("❌ Erreur suppression (HTTP %s): %s", response.status_code, response.text)
             return False
         except Exception as e:
-            print(f"❌ Erreur critique lors de la suppression: {e}")
+            logger.exception("❌ Erreur critique lors de la suppression: %s", e)
             return False
+
+    def list_remote(self, directory):
+        """Fichiers présents sur le site : [{'filename', 'size', 'sha256'?}], ou None si l'API ne sait pas lister.
+
+        Attend de upload.php une réponse à GET ?action=list&directory=... de la forme
+        {"success": true, "files": [{"filename": "...", "size": 123, "sha256": "..."}]}.
+        """
+        try:
+            with metrics.upstream('upload') as call:
+                response = call.record(requests.get(
+                    self.api_url,
+                    params={'action': 'list', 'directory': directory},
+                    headers={'X-Api-Key': self.api_key},
+                    timeout=30
+                ))
+            result = response.json() if response.status_code == 200 else {}
+        except Exception as e:
+            logger.error("❌ Impossible de lister %s/ sur le site: %s", directory, e)
+            return None
+        if not result.get('success') or not isinstance(result.get('files'), list):
+            logger.error("❌ L'API de publication ne liste pas %s/ (HTTP %s)", directory, response.status_code)
+            return None
+        return result['files']
+
+    def delete_file(self, filename, directory):
+        """Supprime un fichier précis d'un dossier du site (sans ses variantes). Retourne True si supprimé."""
+        return self._delete_via_api(filename, directory)
+
+    def unpublish(self, filename, is_client_offer=False):
+        """Supprime une page publiée et ses variantes précompressées"""
+        directory = 'clients' if is_client_offer else 'offres'
+        logger.info("🗑️ Suppression via API: %s dans %s/", filename, directory)
+        if not self._delete_via_api(filename, directory):
+            return False
+        for extension in VARIANT_EXTENSIONS:
+            self._delete_via_api(f"{filename}{extension}", directory)
+        return True
     
     def test_connection(self):
         """Test de connexion à l'API"""
         try:
-            print("\n🔍 TEST DE CONNEXION API")
+            logger.info("🔍 Test de connexion API")
             headers = {'X-Api-Key': self.api_key}
             response = requests.get(self.api_url, headers=headers, timeout=10)
             if response.status_code == 200 and response.json().get('success'):
                 result = response.json()
-                print(f"✅ API connectée: {result.get('message')}")
+                logger.info("✅ API connectée: %s", result.get('message'))
                 return True
             else:
-                print(f"❌ Erreur connexion API (HTTP {response.status_code}): {response.text}")
+                logger.error("❌ Erreur connexion API (HTTP %s): %s", response.status_code, response.text)
                 return False
         except Exception as e:
-            print(f"❌ Erreur critique pendant le test: {e}")
+            logger.exception("❌ Erreur critique pendant le test: %s", e)
             return False
 
 class RealAPIGatherer:
     def __init__(self):
         self.google_api_key = os.environ.get('GOOGLE_API_KEY')
+        self.places_api_base = os.environ.get('PLACES_API_BASE') or PLACES_API_BASE
+        self.youtube_api_base = os.environ.get('YOUTUBE_API_BASE') or YOUTUBE_API_BASE
         if not self.google_api_key:
-            print("❌ ERREUR CRITIQUE: Variable GOOGLE_API_KEY manquante")
+            logger.error("❌ Variable GOOGLE_API_KEY manquante")
+        elif os.environ.get('GEMINI_API_ENDPOINT'):
+            # Point d'accès REST alternatif (serveur local des benchmarks)
+            genai.configure(api_key=self.google_api_key, transport='rest',
+                            client_options={'api_endpoint': os.environ['GEMINI_API_ENDPOINT']})
         else:
             genai.configure(api_key=self.google_api_key)
-            print("✅ Clé API Google chargée et configurée")
+            logger.debug("✅ Clé API Google chargée et configurée")
 
     def generate_whatsapp_catchphrase(self, trip_details):
         if not self.google_api_key:
@@ -184,43 +316,48 @@ class RealAPIGatherer:
                 f"Exemples : 'Le paradis vous attend à prix d'ami ! 🌴', 'Évadez-vous sous le soleil de {trip_details['destination']} à un tarif jamais vu !', "
                 f"'Saisissez cette chance unique de découvrir {trip_details['hotel_name']} ! ✨'"
             )
-            response = model.generate_content(prompt)
+            with metrics.upstream('gemini'):
+                response = model.generate_content(prompt)
             clean_text = response.text.strip().replace('*', '').replace('"', '')
             return clean_text
         except Exception as e:
-            print(f"❌ Erreur API Gemini (catchphrase): {e}")
+            logger.warning("❌ Erreur API Gemini (catchphrase): %s", e)
             return "Découvrez notre offre exclusive pour cette destination de rêve !"
             
     def get_real_hotel_photos(self, hotel_name, destination):
         if not self.google_api_key: return []
         try:
-            search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+            search_url = f"{self.places_api_base}/textsearch/json"
             search_params = {'query': f'"{hotel_name}" "{destination}" hotel', 'key': self.google_api_key, 'fields': 'photos,place_id'}
-            search_response = requests.get(search_url, params=search_params, timeout=15)
+            with metrics.upstream('places') as call:
+                search_response = call.record(requests.get(search_url, params=search_params, timeout=15))
             if search_response.status_code == 200 and (search_data := search_response.json()).get('results'):
                 place_id = search_data['results'][0].get('place_id')
-                details_url = "https://maps.googleapis.com/maps/api/place/details/json"
+                details_url = f"{self.places_api_base}/details/json"
                 details_params = {'place_id': place_id, 'fields': 'photos', 'key': self.google_api_key}
-                details_response = requests.get(details_url, params=details_params, timeout=15)
+                with metrics.upstream('places') as call:
+                    details_response = call.record(requests.get(details_url, params=details_params, timeout=15))
                 if details_response.status_code == 200:
                     photos = details_response.json().get('result', {}).get('photos', [])
-                    return [f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photoreference={p.get('photo_reference')}&key={self.google_api_key}" for p in photos if p.get('photo_reference')]
+                    return [f"{self.places_api_base}/photo?maxwidth=800&photoreference={p.get('photo_reference')}&key={self.google_api_key}" for p in photos if p.get('photo_reference')]
             return []
         except Exception as e:
-            print(f"❌ Erreur API Photos: {e}")
+            logger.warning("❌ Erreur API Photos: %s", e)
             return []
 
     def get_real_hotel_reviews(self, hotel_name, destination):
         if not self.google_api_key: return {'reviews': [], 'rating': 0, 'total_reviews': 0}
         try:
-            search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+            search_url = f"{self.places_api_base}/textsearch/json"
             search_params = {'query': f'"{hotel_name}" "{destination}" hotel', 'key': self.google_api_key}
-            search_response = requests.get(search_url, params=search_params, timeout=15)
+            with metrics.upstream('places') as call:
+                search_response = call.record(requests.get(search_url, params=search_params, timeout=15))
             if search_response.status_code == 200 and (search_data := search_response.json()).get('results'):
                 place_id = search_data['results'][0].get('place_id')
-                details_url = "https://maps.googleapis.com/maps/api/place/details/json"
-                details_params = {'place_id': place_id, 'fields': 'reviews,rating,user_ratings_total', 'key': self.google_api_key, 'language': 'fr'}
-                details_response = requests.get(details_url, params=details_params, timeout=15)
+                details_url = f"{self.places_api_base}/details/json"
+                details_params = {'place_id': place_id, 'fields': 'reviews,rating,user_ratings_total', 'key': self.google_api_key, 'language': ENRICHMENT_LANGUAGE}
+                with metrics.upstream('places') as call:
+                    details_response = call.record(requests.get(details_url, params=details_params, timeout=15))
 
                 if details_response.status_code == 200 and (result := details_response.json().get('result', {})):
                     all_reviews = result.get('reviews', [])
@@ -242,38 +379,44 @@ class RealAPIGatherer:
                     }
             return {'reviews': [], 'rating': 0, 'total_reviews': 0}
         except Exception as e:
-            print(f"❌ Erreur API Reviews: {e}")
+            logger.warning("❌ Erreur API Reviews: %s", e)
             return {'reviews': [], 'rating': 0, 'total_reviews': 0}
 
     def get_real_youtube_videos(self, hotel_name, destination):
         if not self.google_api_key: return []
         try:
-            youtube_url = "https://www.googleapis.com/youtube/v3/search"
+            youtube_url = f"{self.youtube_api_base}/search"
             youtube_params = {'part': 'snippet', 'q': f'"{hotel_name}" "{destination}" hotel review tour', 'type': 'video', 'maxResults': 4, 'order': 'relevance', 'key': self.google_api_key}
-            youtube_response = requests.get(youtube_url, params=youtube_params, timeout=15)
+            with metrics.upstream('youtube') as call:
+                youtube_response = call.record(requests.get(youtube_url, params=youtube_params, timeout=15))
             if youtube_response.status_code == 200:
-                return [{'id': item['id']['videoId'], 'title': item['snippet']['title']} for item in youtube_response.json().get('items', []) if item.get('id', {}).get('videoId')]
+                return [{
+                    'id': item['id']['videoId'],
+                    'title': item['snippet']['title'],
+                    'thumbnail': item['snippet'].get('thumbnails', {}).get('high', {}).get('url'),
+                } for item in youtube_response.json().get('items', []) if item.get('id', {}).get('videoId')]
             return []
         except Exception as e:
-            print(f"❌ Erreur API YouTube: {e}")
+            logger.warning("❌ Erreur API YouTube: %s", e)
             return []
 
     def get_attraction_image(self, attraction_name, destination):
         if not self.google_api_key: return None
-        print(f"ℹ️ Recherche d'une image réelle pour : {attraction_name} à {destination}")
+        logger.debug("ℹ️ Recherche d'une image réelle pour : %s à %s", attraction_name, destination)
         try:
-            search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+            search_url = f"{self.places_api_base}/textsearch/json"
             search_params = {'query': f'"{attraction_name}" "{destination}"', 'key': self.google_api_key, 'fields': 'photos'}
-            search_response = requests.get(search_url, params=search_params, timeout=15)
+            with metrics.upstream('places') as call:
+                search_response = call.record(requests.get(search_url, params=search_params, timeout=15))
             if search_response.status_code == 200:
                 search_data = search_response.json()
                 if search_data.get('results') and search_data['results'][0].get('photos'):
                     photo_reference = search_data['results'][0]['photos'][0].get('photo_reference')
                     if photo_reference:
-                        return f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photoreference={photo_reference}&key={self.google_api_key}"
+                        return f"{self.places_api_base}/photo?maxwidth=800&photoreference={photo_reference}&key={self.google_api_key}"
             return None
         except Exception as e:
-            print(f"❌ Erreur API Image Attraction: {e}")
+            logger.warning("❌ Erreur API Image Attraction: %s", e)
             return None
 
     def get_real_gemini_attractions_and_restaurants(self, destination):
@@ -283,15 +426,30 @@ class RealAPIGatherer:
             # MODIFIÉ : Utilisation du modèle le plus récent et efficace
             model = genai.GenerativeModel('models/gemini-2.5-flash')
             prompt = f'Donne-moi 8 points d\'intérêt pour {destination} et une sélection de 3 des meilleurs restaurants. Réponds UNIQUEMENT en JSON: {{"attractions": [{{"name": "Nom", "type": "plage|culture|gastronomie|activite"}}], "restaurants": [{{"name": "Nom du restaurant"}}]}}'
-            response = model.generate_content(prompt)
+            with metrics.upstream('gemini'):
+                response = model.generate_content(prompt)
             response_text = response.text.strip().replace("```json", "").replace("```", "").strip()
             parsed_data = json.loads(response_text)
             return parsed_data
         except Exception as e:
-            print(f"❌ Erreur API Gemini: {e}")
+            logger.warning("❌ Erreur API Gemini: %s", e)
             return {"attractions": [], "restaurants": []}
 
-    def gather_all_real_data(self, hotel_name, destination):
+    def _gather_photos(self, hotel_name, destination):
+        return {'photos': self.get_real_hotel_photos(hotel_name, destination)}
+
+    def _gather_reviews(self, hotel_name, destination):
+        reviews_data = self.get_real_hotel_reviews(hotel_name, destination)
+        return {
+            'reviews': reviews_data.get('reviews', []),
+            'hotel_rating': reviews_data.get('rating', 0),
+            'total_reviews': reviews_data.get('total_reviews', 0)
+        }
+
+    def _gather_videos(self, hotel_name, destination):
+        return {'videos': self.get_real_youtube_videos(hotel_name, destination)}
+
+    def _gather_attractions(self, hotel_name, destination):
         gemini_data = self.get_real_gemini_attractions_and_restaurants(destination)
         attractions_list = gemini_data.get("attractions", [])
         restaurants_list = gemini_data.get("restaurants", [])
@@ -304,24 +462,130 @@ class RealAPIGatherer:
 
         cultural_attraction_image = None
         if attractions_by_category.get('culture'):
-             if attractions_by_category['culture']: # S'assurer que la liste n'est pas vide
-                first_cultural_attraction = attractions_by_category['culture'][0]
-                cultural_attraction_image = self.get_attraction_image(first_cultural_attraction, destination)
-
-        reviews_data = self.get_real_hotel_reviews(hotel_name, destination)
+            first_cultural_attraction = attractions_by_category['culture'][0]
+            cultural_attraction_image = self.get_attraction_image(first_cultural_attraction, destination)
 
         return {
-            'photos': self.get_real_hotel_photos(hotel_name, destination),
-            'reviews': reviews_data.get('reviews', []),
-            'hotel_rating': reviews_data.get('rating', 0),
-            'total_reviews': reviews_data.get('total_reviews', 0),
-            'videos': self.get_real_youtube_videos(hotel_name, destination),
             'attractions': attractions_by_category,
             'restaurants': restaurants_list,
             'cultural_attraction_image': cultural_attraction_image
         }
 
-def generate_travel_page_html(data, real_data, savings, comparison_total):
+    def iter_real_data(self, hotel_name, destination, sources=None):
+        """Lance les sources en parallèle et renvoie (source, données partielles) dès qu'une source a terminé."""
+        all_sources = {
+            'photos': self._gather_photos,
+            'reviews': self._gather_reviews,
+            'videos': self._gather_videos,
+            'attractions': self._gather_attractions,
+        }
+        selected = {name: fn for name, fn in all_sources.items() if sources is None or name in sources}
+        if not selected:
+            return
+        with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+            # Chaque tâche reçoit une copie du contexte (identifiant de requête des journaux)
+            futures = {
+                executor.submit(contextvars.copy_context().run, fn, hotel_name, destination): name
+                for name, fn in selected.items()
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    @staticmethod
+    def source_inputs(form_data):
+        """Retourne, pour chaque source d'enrichissement, les valeurs d'entrée dont elle dépend."""
+        values = {
+            'hotel_name': (form_data.get('hotel_name') or '').strip(),
+            'destination': (form_data.get('destination') or '').strip(),
+            'language': ENRICHMENT_LANGUAGE,
+        }
+        return {source: {key: values[key] for key in keys} for source, keys in ENRICHMENT_SOURCE_INPUTS.items()}
+
+    def refresh_stale_sources(self, api_data, previous_inputs, form_data):
+        """Ré-interroge uniquement les sources dont les entrées ont changé et fusionne le résultat dans api_data.
+
+        Retourne (api_data, api_inputs, sources_rafraichies).
+        """
+        if not self.google_api_key:
+            return api_data, previous_inputs, []
+
+        new_inputs = self.source_inputs(form_data)
+        stale_sources = [source for source, inputs in new_inputs.items() if (previous_inputs or {}).get(source) != inputs]
+
+        merged_api_data = dict(api_data or {})
+        for _, partial_data in self.iter_real_data(form_data.get('hotel_name', ''), form_data.get('destination', ''), sources=stale_sources):
+            merged_api_data.update(partial_data)
+
+        return merged_api_data, new_inputs, stale_sources
+
+    @staticmethod
+    def assemble_real_data(real_data):
+        """Construit le dictionnaire api_data complet à partir des résultats partiels des sources."""
+        return {
+            'photos': real_data.get('photos', []),
+            'reviews': real_data.get('reviews', []),
+            'hotel_rating': real_data.get('hotel_rating', 0),
+            'total_reviews': real_data.get('total_reviews', 0),
+            'videos': real_data.get('videos', []),
+            'attractions': real_data.get('attractions', {}),
+            'restaurants': real_data.get('restaurants', []),
+            'cultural_attraction_image': real_data.get('cultural_attraction_image')
+        }
+
+    def gather_all_real_data(self, hotel_name, destination):
+        real_data = {}
+        for _, partial_data in self.iter_real_data(hotel_name, destination):
+            real_data.update(partial_data)
+        return self.assemble_real_data(real_data)
+
+def video_thumbnail_url(video):
+    """Miniature d'une vidéo : celle renvoyée par l'API YouTube, sinon l'URL standard de i.ytimg.com."""
+    return video.get('thumbnail') or YOUTUBE_THUMBNAIL_URL.format(video_id=video['id'])
+
+def _responsive_img_html(url, alt, images=None, css_class='', style='', sizes='100vw', eager=False, deferred=False):
+    """Balise image avec srcset WebP/JPEG si des déclinaisons existent pour cette URL.
+
+    images=None (aperçu interne) garde l'URL d'origine ; pour une page publiée (dictionnaire des
+    déclinaisons), une photo sans déclinaison est remplacée par l'image neutre.
+
+    deferred=True écrit les sources dans data-src/data-srcset : le navigateur ne télécharge rien
+    tant que le script de la page ne les a pas recopiées (ouverture de la modale photos).
+    """
+    loading_attrs = 'fetchpriority="high"' if eager else 'loading="lazy" decoding="async"'
+    prefix = 'data-' if deferred else ''
+    class_attr = f' class="{css_class}"' if css_class else ''
+    style_attr = f' style="{style}"' if style else ''
+    derivatives = (images or {}).get(url)
+    if not derivatives:
+        if images is not None:
+            # Page publiée : jamais d'URL Places brute (elle contient la clé API)
+            url = public_image_url(url)
+        # Dimensions des photos Places (maxwidth=800) : réserve la place avant le chargement
+        width, height = PLACES_PHOTO_SIZE
+        return f'<img {prefix}src="{url}" width="{width}" height="{height}" alt="{alt}"{class_attr}{style_attr} {loading_attrs}>'
+
+    webp_srcset = ', '.join(f'{src} {width}w' for width, src in derivatives['sources']['webp'])
+    jpg_srcset = ', '.join(f'{src} {width}w' for width, src in derivatives['sources']['jpg'])
+    return (
+        f'<picture><source type="image/webp" {prefix}srcset="{webp_srcset}" sizes="{sizes}">'
+        f'<img {prefix}src="{derivatives["src"]}" {prefix}srcset="{jpg_srcset}" sizes="{sizes}" width="{derivatives["width"]}" height="{derivatives["height"]}" '
+        f'alt="{alt}"{class_attr}{style_attr} {loading_attrs}></picture>'
+    )
+
+def offer_stylesheet_html():
+    """Balise <style> avec la feuille purgée, ou le lien CDN si elle n'a pas encore été générée."""
+    global _offer_stylesheet_html
+    if _offer_stylesheet_html is None:
+        try:
+            with open(OFFER_CSS_PATH, encoding='utf-8') as f:
+                _offer_stylesheet_html = f'<style>{f.read()}</style>'
+        except OSError:
+            logger.error("❌ %s absent (lancer build_offer_css.py) : Tailwind chargé depuis le CDN", OFFER_CSS_PATH)
+            _offer_stylesheet_html = f'<link href="{TAILWIND_CDN_URL}" rel="stylesheet">'
+    return _offer_stylesheet_html
+
+
+def generate_travel_page_html(data, real_data, savings, comparison_total, images=None):
     hotel_name_full = data.get('hotel_name', '')
     hotel_name_parts = hotel_name_full.split(',')
     display_hotel_name = hotel_name_parts[0].strip()
@@ -453,15 +717,18 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
         """
     
     total_photos = len(real_data['photos'])
-    image_gallery = "".join([f'<div class="image-item"><img src="{url}" alt="Photo de {data["hotel_name"]}"></div>' for url in real_data['photos'][:6]]) or '<p>Aucune photo disponible.</p>'
+    gallery_alt = f"Photo de {data['hotel_name']}"
+    image_gallery = "".join([f'<div class="image-item">{_responsive_img_html(url, gallery_alt, images, sizes="(max-width: 600px) 100vw, 300px")}</div>' for url in real_data['photos'][:6]]) or '<p>Aucune photo disponible.</p>'
     more_photos_button = f'<div class="text-center mt-4"><button id="voirPlusPhotos" class="bg-blue-500 hover:bg-blue-600 text-white font-semibold py-3 px-6 rounded-full transition-colors">📸 Voir plus de photos ({total_photos} au total)</button></div>' if total_photos > 6 else ""
-    modal_all_photos = "".join([f'<img src="{url}" alt="Photo {i+1} de {data["hotel_name"]}" class="modal-photo">' for i, url in enumerate(real_data['photos'])])
+    modal_all_photos = "".join([_responsive_img_html(url, f"Photo {i+1} de {data['hotel_name']}", images, css_class="modal-photo", sizes="(max-width: 800px) 100vw, 800px", deferred=True) for i, url in enumerate(real_data['photos'])])
 
     video_html_block = ""
     if real_data.get('videos'):
-        embed_url = f"https://www.youtube.com/embed/{real_data['videos'][0]['id']}"
-        video_title = real_data['videos'][0]['title']
-        video_html_block = f"""<div id="video-section-wrapper" class="instagram-card p-6"><h3 class="section-title text-xl mb-4">Vidéo</h3><div><h4 class="font-semibold mb-2">Visite de l'hôtel</h4><div class="video-container aspect-w-16 aspect-h-9"><iframe src="{embed_url}" title="{video_title}" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture" allowfullscreen class="w-full h-full rounded-lg"></iframe></div></div></div>"""
+        # Façade : miniature + bouton lecture, le lecteur YouTube (~1 Mo de JS) n'est chargé qu'au clic
+        video = real_data['videos'][0]
+        video_title = html.escape(video['title'])
+        thumbnail_html = _responsive_img_html(video_thumbnail_url(video), video_title, images, css_class="video-thumbnail", sizes="(max-width: 600px) 100vw, 600px")
+        video_html_block = f"""<div id="video-section-wrapper" class="instagram-card p-6"><h3 class="section-title text-xl mb-4">Vidéo</h3><div><h4 class="font-semibold mb-2">Visite de l'hôtel</h4><div class="video-container aspect-w-16 aspect-h-9 video-facade" data-video-id="{html.escape(video['id'])}" data-video-title="{video_title}" role="button" tabindex="0" aria-label="Lire la vidéo : {video_title}">{thumbnail_html}<span class="video-play" aria-hidden="true"></span></div></div></div>"""
 
     reviews_section = "".join([f'<div class="bg-gray-50 p-4 rounded-lg"><div><span class="font-semibold">{r["author"]}</span> <span class="text-yellow-500">{r["rating"]}</span> <span class="text-gray-500 text-sm float-right">{r.get("date", "")}</span></div><p class="mt-2 text-gray-700">"{r["text"]}"</p></div>' for r in real_data.get('reviews', [])])
 
@@ -469,7 +736,8 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
     if real_data.get('cultural_attraction_image'):
         cultural_attraction_name = real_data.get('attractions', {}).get('culture', [''])[0] if real_data.get('attractions', {}).get('culture') else ''
         if cultural_attraction_name:
-            destination_section += f'<div class="mb-6 rounded-lg overflow-hidden shadow-lg"><img src="{real_data["cultural_attraction_image"]}" alt="Image de {cultural_attraction_name}" class="w-full h-48 object-cover"><div class="p-4 bg-gray-50"><h4 class="font-bold text-gray-800">Incontournable : {cultural_attraction_name}</h4></div></div>'
+            cultural_image_html = _responsive_img_html(real_data["cultural_attraction_image"], f"Image de {cultural_attraction_name}", images, css_class="w-full h-48 object-cover", sizes="(max-width: 600px) 100vw, 600px")
+            destination_section += f'<div class="mb-6 rounded-lg overflow-hidden shadow-lg">{cultural_image_html}<div class="p-4 bg-gray-50"><h4 class="font-bold text-gray-800">Incontournable : {cultural_attraction_name}</h4></div></div>'
 
     if real_data.get('restaurants'):
         restaurants_list_items = "".join([f'<li class="flex items-center"><i class="fas fa-utensils text-yellow-500 mr-3"></i><span>{resto.get("name")}</span></li>' for resto in real_data['restaurants']])
@@ -512,7 +780,7 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
 
         <div class="instagram-card p-6 text-center">
             <h3 class="text-xl font-semibold mb-4">📞 Contact & Infos</h3>
-            <img src="https://static.wixstatic.com/media/5ca515_449af35c8bea462986caf4fd28e02398~mv2.png" alt="Logo Voyages Privilèges" class="h-12 mx-auto mb-4">
+            <img src="https://static.wixstatic.com/media/5ca515_449af35c8bea462986caf4fd28e02398~mv2.png" alt="Logo Voyages Privilèges" class="h-12 mx-auto mb-4" loading="lazy" decoding="async">
             <p class="text-gray-800">📍 Rue Philippe Monnoyer 21, 6180 Courcelles</p>
             <p class="text-gray-800 my-2">📞 <a href="tel:+32488433344" class="text-blue-600">+32 488 43 33 44</a></p>
             <p class="text-gray-800">✉️ <a href="mailto:infos@voyages-privileges.be" class="text-blue-600">infos@voyages-privileges.be</a></p>
@@ -521,16 +789,24 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
         </div>
     """
     
+    header_image_html = _responsive_img_html(
+        real_data['photos'][0] if real_data['photos'] else '', data['hotel_name'], images,
+        style="width: 100%; height: 256px; object-fit: cover; border-radius: 8px; margin-bottom: 1rem;",
+        sizes="(max-width: 600px) 100vw, 600px", eager=True
+    )
+
     story_card_style = "background: linear-gradient(135deg, #FECACA 0%, #F87171 100%);" if is_ultra_budget else "background: linear-gradient(135deg, #3B82F6 0%, #60A5FA 100%);"
 
     html_template = f"""<!DOCTYPE html>
 <html lang="fr">
 <head>
     <meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>Voyages Privilèges - {display_hotel_name}</title>
-    <link href="https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <link href="https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700&family=Poppins:wght@300;400;600&display=swap" rel="stylesheet">
-    <script src="https://cdn.tailwindcss.com?plugins=aspect-ratio"></script>
+    {offer_stylesheet_html()}
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <!-- Icônes et polices hors du chemin critique : la page s'affiche sans les attendre -->
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" media="print" onload="this.media='all'">
+    <link href="https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700&family=Poppins:wght@300;400;600&display=swap" rel="stylesheet" media="print" onload="this.media='all'">
+    <noscript><link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css"><link href="https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700&family=Poppins:wght@300;400;600&display=swap" rel="stylesheet"></noscript>
     <style>
         body {{ font-family: 'Poppins', sans-serif; }} .section-title {{ font-family: 'Playfair Display', serif; }}
         .instagram-card {{ background: white; border-radius: 20px; box-shadow: 0 10px 30px rgba(0,0,0,0.08); overflow: hidden; }}
@@ -544,7 +820,13 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
         .modal-photos-content {{ max-width: 800px; margin: 0 auto; padding-top: 60px; }}
         .close-photos {{ position: fixed; top: 20px; right: 30px; font-size: 40px; color: white; cursor: pointer; z-index: 1001; font-weight: bold; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; background: rgba(0,0,0,0.5); border-radius: 50%; }}
         .close-photos:hover {{ background: rgba(255,255,255,0.2); }}
-        .modal-photo {{ width: 100%; margin-bottom: 20px; border-radius: 15px; box-shadow: 0 10px 30px rgba(0,0,0,0.3); }}
+        .aspect-w-16 {{ position: relative; padding-bottom: 56.25%; }} .aspect-w-16 > * {{ position: absolute; top: 0; right: 0; bottom: 0; left: 0; width: 100%; height: 100%; }}
+        .video-facade {{ cursor: pointer; border-radius: 8px; overflow: hidden; background: #000; }} .video-thumbnail {{ width: 100%; height: 100%; object-fit: cover; }}
+        .aspect-w-16 > .video-play {{ top: 50%; left: 50%; width: 68px; height: 48px; transform: translate(-50%, -50%); background: rgba(255,0,0,0.9); border-radius: 12px; }}
+        .video-play::before {{ content: ''; position: absolute; top: 50%; left: 55%; transform: translate(-50%, -50%); border-style: solid; border-width: 10px 0 10px 18px; border-color: transparent transparent transparent white; }}
+        /* Couleurs absentes de la palette par défaut de Tailwind 2 (feuille purgée et CDN) */
+        .text-orange-800 {{ color: #9a3412; }} .bg-orange-500 {{ background-color: #f97316; }}
+        .modal-photo {{ width: 100%; height: auto; margin-bottom: 20px; border-radius: 15px; box-shadow: 0 10px 30px rgba(0,0,0,0.3); }}
         .photo-counter {{ position: fixed; top: 20px; left: 30px; color: white; background: rgba(0,0,0,0.5); padding: 10px 15px; border-radius: 20px; font-weight: bold; z-index: 1001; }}
         @media (max-width: 768px) {{ .close-photos {{ top: 15px; right: 15px; font-size: 30px; width: 40px; height: 40px; }} .photo-counter {{ top: 15px; left: 15px; padding: 8px 12px; font-size: 14px; }} .modal-photos-content {{ padding-top: 80px; padding-left: 10px; padding-right: 10px; }} }}
     </style>
@@ -555,7 +837,7 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
             <img src="https://static.wixstatic.com/media/5ca515_449af35c8bea462986caf4fd28e02398~mv2.png" alt="Logo Voyages Privilèges" style="max-height: 50px; margin: auto;">
         </div>
         <div class="story-card">
-            <img src="{real_data['photos'][0] if real_data['photos'] else ''}" alt="{data['hotel_name']}" style="width: 100%; height: 256px; object-fit: cover; border-radius: 8px; margin-bottom: 1rem;">
+            {header_image_html}
             <h2 class="text-2xl font-bold">{display_hotel_name} {stars}</h2>
             <p>📍 {display_address}</p>
             <p class="mt-4">🗓️ Du {date_start} au {date_end}</p>
@@ -587,7 +869,28 @@ def generate_travel_page_html(data, real_data, savings, comparison_total):
         const closeBtn = document.getElementById('closePhotos');
         const photoCounter = document.getElementById('photoCounter');
         const modalPhotos = document.querySelectorAll('.modal-photo');
-        if (voirPlusBtn) {{ voirPlusBtn.addEventListener('click', function() {{ if (modal) modal.style.display = 'block'; document.body.style.overflow = 'hidden'; }}); }}
+        function loadModalPhotos() {{
+            // Photos de la modale téléchargées seulement à la première ouverture (puis en lazy au défilement)
+            modal.querySelectorAll('[data-srcset]').forEach(function(el) {{ el.srcset = el.dataset.srcset; el.removeAttribute('data-srcset'); }});
+            modal.querySelectorAll('img[data-src]').forEach(function(img) {{ img.src = img.dataset.src; img.removeAttribute('data-src'); }});
+        }}
+        document.querySelectorAll('.video-facade').forEach(function(facade) {{
+            function play() {{
+                if (!facade.classList.contains('video-facade')) return;
+                const iframe = document.createElement('iframe');
+                iframe.src = 'https://www.youtube.com/embed/' + encodeURIComponent(facade.dataset.videoId) + '?autoplay=1';
+                iframe.title = facade.dataset.videoTitle;
+                iframe.allow = 'accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture';
+                iframe.allowFullscreen = true;
+                iframe.className = 'w-full h-full rounded-lg';
+                iframe.setAttribute('frameborder', '0');
+                facade.replaceChildren(iframe);
+                facade.classList.remove('video-facade');
+            }}
+            facade.addEventListener('click', play);
+            facade.addEventListener('keydown', function(e) {{ if (e.key === 'Enter' || e.key === ' ') {{ e.preventDefault(); play(); }} }});
+        }});
+        if (voirPlusBtn) {{ voirPlusBtn.addEventListener('click', function() {{ if (modal) {{ loadModalPhotos(); modal.style.display = 'block'; }} document.body.style.overflow = 'hidden'; }}); }}
         function closeModal() {{ if (modal) modal.style.display = 'none'; document.body.style.overflow = 'auto'; }}
         if (closeBtn) {{ closeBtn.addEventListener('click', closeModal); }}
         if (modal) {{ modal.addEventListener('click', function(e) {{ if (e.target === modal) {{ closeModal(); }} }}); }}
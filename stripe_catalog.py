@@ -0,0 +1,75 @@
+# stripe_catalog.py - Produits et prix Stripe créés une seule fois par voyage et par montant
+import hashlib
+import json
+import logging
+
+import stripe
+from flask import current_app
+
+import metrics
+from models import db, StripePrice
+
+logger = logging.getLogger(__name__)
+
+
+def _idempotency_prefix():
+    """Espace de noms des clés : dev, staging et prod partagent le compte Stripe mais pas la base."""
+    prefix = current_app.config.get('STRIPE_IDEMPOTENCY_PREFIX')
+    if not prefix:
+        database_url = db.engine.url.render_as_string(hide_password=True)
+        prefix = 'odyssee-' + hashlib.sha256(database_url.encode('utf-8')).hexdigest()[:12]
+    return prefix
+
+
+def _idempotency_key(kind, params):
+    # Stripe conserve les clés 24 h : un nouvel essai après une coupure réseau ne crée pas de doublon.
+    # L'empreinte des paramètres évite un refus de Stripe si le voyage a changé entre-temps (client renommé).
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    return f"{_idempotency_prefix()}-{kind}-{digest}"
+
+
+def price_for_trip(trip, amount, currency='eur'):
+    """Retourne l'ID du prix Stripe pour ce voyage et ce montant (en euros), en le créant au besoin."""
+    existing = StripePrice.query.filter_by(trip_id=trip.id, currency=currency).all()
+    for entry in existing:
+        if entry.amount == amount:
+            metrics.record_cache('stripe_prices', True)
+            return entry.stripe_price_id
+    metrics.record_cache('stripe_prices', False)
+
+    # Un seul produit par voyage, partagé par tous ses montants (total, acomptes)
+    product_id = existing[0].stripe_product_id if existing else None
+    with metrics.upstream('stripe'):
+        if product_id is None:
+            product_params = {
+                'name': f"Voyage: {trip.hotel_name} pour {trip.client_first_name} {trip.client_last_name}",
+                'metadata': {'trip_id': trip.id},
+            }
+            product = stripe.Product.create(**product_params, idempotency_key=_idempotency_key('product', product_params))
+            product_id = product.id
+        price_params = {'product': product_id, 'unit_amount': amount * 100, 'currency': currency}
+        price = stripe.Price.create(**price_params, idempotency_key=_idempotency_key('price', price_params))
+
+    db.session.add(StripePrice(
+        trip_id=trip.id,
+        amount=amount,
+        currency=currency,
+        stripe_product_id=product_id,
+        stripe_price_id=price.id,
+    ))
+    logger.info("💳 Prix Stripe créé pour le voyage %s: %s € (%s)", trip.id, amount, price.id)
+    return price.id
+
+
+def create_checkout_session(trip, amount, success_url, cancel_url, currency='eur'):
+    """Crée la session de paiement (seul appel Stripe systématique à chaque envoi)."""
+    price_id = price_for_trip(trip, amount, currency)
+    with metrics.upstream('stripe'):
+        return stripe.checkout.Session.create(
+            line_items=[{'price': price_id, 'quantity': 1}],
+            mode='payment',
+            success_url=success_url,
+            cancel_url=cancel_url,
+            client_reference_id=trip.id,
+            customer_email=trip.client_email,
+        )
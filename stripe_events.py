@@ -0,0 +1,146 @@
+# stripe_events.py - Ingestion des webhooks Stripe : enregistrement dédupliqué puis traitement en arrière-plan
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+
+import fastjson
+import metrics
+from models import db, Trip, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_EVENTS = ('checkout.session.completed', 'checkout.session.async_payment_succeeded')
+
+
+def record_event(event, payload):
+    """Enregistre l'événement s'il est nouveau. Retourne False pour un doublon (Stripe réessaie souvent)."""
+    if StripeEvent.query.filter_by(stripe_event_id=event.id).first() is not None:
+        metrics.record_stripe_event(event.type, 'duplicate')
+        return False
+    db.session.add(StripeEvent(
+        stripe_event_id=event.id,
+        type=event.type,
+        payload=payload.decode('utf-8') if isinstance(payload, bytes) else payload,
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Même événement livré deux fois en parallèle : l'autre requête l'a déjà enregistré
+        db.session.rollback()
+        metrics.record_stripe_event(event.type, 'duplicate')
+        return False
+    metrics.record_stripe_event(event.type, 'received')
+    return True
+
+
+def _apply_checkout_completed(data):
+    """Reporte le paiement d'une session Checkout sur le voyage (client_reference_id)."""
+    if data.get('payment_status') not in ('paid', 'no_payment_required'):
+        # Paiement différé (virement) : Stripe enverra async_payment_succeeded plus tard
+        return 'ignored'
+    reference = data.get('client_reference_id')
+    trip = db.session.get(Trip, int(reference)) if reference and str(reference).isdigit() else None
+    if trip is None:
+        raise LookupError(f"Aucun voyage pour client_reference_id={reference!r}")
+    trip.amount_paid = (trip.amount_paid or 0) + (data.get('amount_total') or 0) // 100
+    trip.paid_at = datetime.utcnow()
+    logger.info("💶 Paiement Stripe reçu pour le voyage %s: %s € (total payé %s €)",
+                trip.id, (data.get('amount_total') or 0) // 100, trip.amount_paid)
+    return 'processed'
+
+
+def apply_event(event_type, payload):
+    """Applique un événement déjà vérifié. Retourne le statut final ('processed' ou 'ignored')."""
+    if event_type in PAYMENT_EVENTS:
+        return _apply_checkout_completed(fastjson.loads(payload)['data']['object'])
+    return 'ignored'
+
+
+def process_pending(batch_size=50, claim_timeout=600):
+    """Traite un lot d'événements en attente et retourne le nombre d'événements traités.
+
+    Un événement réservé ('processing') depuis plus de `claim_timeout` secondes est repris : le
+    processus qui l'avait réservé s'est arrêté en cours de lot (redéploiement, worker tué).
+    """
+    now = datetime.utcnow()
+    claimable = or_(StripeEvent.status == 'pending',
+                    and_(StripeEvent.status == 'processing',
+                         StripeEvent.claimed_at < now - timedelta(seconds=claim_timeout)))
+    candidates = [row.id for row in db.session.query(StripeEvent.id)
+                  .filter(claimable).order_by(StripeEvent.id).limit(batch_size)]
+    # Réservation ligne par ligne : un autre worker gunicorn peut lire le même lot
+    claimed = [event_id for event_id in candidates if db.session.execute(
+        update(StripeEvent).where(StripeEvent.id == event_id, claimable)
+        .values(status='processing', claimed_at=now)).rowcount == 1]
+    db.session.commit()
+    if not claimed:
+        return 0
+
+    try:
+        events = StripeEvent.query.filter(StripeEvent.id.in_(claimed)).order_by(StripeEvent.id).all()
+        for event in events:
+            try:
+                # Les gestionnaires valident tout avant de modifier quoi que ce soit :
+                # un événement en erreur n'annule pas le reste du lot
+                event.status = apply_event(event.type, event.payload)
+            except (LookupError, ValueError, TypeError) as e:
+                logger.error("❌ Événement Stripe %s (%s) en échec: %s", event.stripe_event_id, event.type, e)
+                event.status = 'failed'
+                event.error = str(e)
+            event.processed_at = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        # Erreur de base de données : le lot repasse en attente pour la prochaine tentative
+        db.session.rollback()
+        db.session.execute(update(StripeEvent).where(StripeEvent.id.in_(claimed)).values(status='pending', claimed_at=None))
+        db.session.commit()
+        raise
+    for event in events:
+        metrics.record_stripe_event(event.type, event.status)
+    return len(claimed)
+
+
+class StripeEventWorker:
+    """Thread qui vide la file des événements en attente, par lots.
+
+    Démarré par create_app (dans chaque worker gunicorn, après le fork) : les événements restés en
+    attente ou bloqués après un redémarrage sont repris sans attendre le prochain webhook.
+    """
+
+    def __init__(self, app, batch_size=50, poll_interval=30, claim_timeout=600):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stripe-events', daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        # Premier passage immédiat : reprise de ce qui est resté en attente
+        self._wake.set()
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                # Une rafale d'événements est traitée en quelques lots plutôt qu'un par un
+                while True:
+                    with self.app.app_context():
+                        processed = process_pending(self.batch_size, self.claim_timeout)
+                    if processed < self.batch_size:
+                        break
+            except Exception as e:
+                logger.exception("❌ Erreur du traitement des événements Stripe: %s", e)